@@ -1,85 +1,131 @@
-
-CELL_SIZE = 30
-PELLET_POINT = 1
-SHARED_ROUTE_PENALTY = 8
-AGENT_SPEED = 10
-MAX_ENERGY = 80
-
-GHOST_SPEED = 10
-LOTTERY_FAIL_CHANCE = 0.8
-ENERGY_LOSS_PER_MOVE = 0.5
-GHOST_CATCH_PENALTY = 10
-GHOST_AVOIDANCE_RADIUS = 2
-
-PELLET_SPAWN_RATIO = 0.3
-SCORE_PER_DEAD_AGENT_THRESHOLD = 1
-FONT_SIZE = 18
-
-# Sensing / anticipation
-SENSING_RADIUS = 4
-LOOKAHEAD_STEPS = 2
-
-# --- STRATEGY 2: Alternating Offers (MODIFIED) ---
-NEGOTIATION_MODE = "alternating_offers"
-MAX_NEGOTIATION_ROUNDS = 3
-
-# === MENTOR FIX: INCREASED WAIT TIMES ===
-LOSER_WAIT_TURNS_SUCCESS = 3      
-FALLBACK_WAIT_TURNS = 5           
-
-LOSER_PENALTY_SUCCESS = 3         # mild score loss on success
-FALLBACK_PENALTY_BOTH = 15        # heavy penalty on timeout/fallback
-
-# Batch config
-MAX_EPISODES = 20
-
-# Colors
-BLACK = (0, 0, 0)
-WALL_COLOR = (40, 40, 50)
-CORRIDOR_FLOOR_COLOR = (60, 60, 80)
-TEXT_COLOR = (255, 255, 255)
-HIGHLIGHT_COLOR = (255, 255, 0)
-
-BAR_WIDTH = 250
-BAR_HEIGHT = 10
-BAR_BG_COLOR = (30, 30, 30)
-BAR_GOOD_COLOR = (0, 180, 0)
-BAR_WARN_COLOR = (255, 165, 0)
-BAR_DANGER_COLOR = (255, 0, 0)
-
-AGENT_COLORS = [(255, 50, 50), (50, 255, 50), (50, 100, 255)]
-GHOST_COLORS = [(255, 150, 150), (150, 255, 150), (150, 150, 255)]
-
-# --- Maze layout ---
-MAZE_LAYOUT = [
-    "###############################",
-    "#.............................#",
-    "###########.###.###############",
-    "#.#........##.#.#.......#.#...#",
-    "#.#.#.#####.#.....###.#.#.###.#",
-    "#.#.#.......#.#.##....#.#.....#",
-    "#.###.#######.#.#####.###.#####",
-    "#...........#.#.#.........#...#",
-    "#######.###.#.#.###.#######.#.#",
-    "#......#....#.#.#...........#.#",
-    "#.#####.###...#.###########.#.#",
-    "#...........#.C.C.........#...#",
-    "#.###########.#.#.###########C#",
-    "#.#.#.........#.#.....#.#.....#",
-    "#.#.#.#########.###.#.#.#.###.#",
-    "#.....#.....#.#.#...#.....#...#",
-    "#.#########.#.#.#.#############",
-    "#.............#.#.............#",
-    "#C###############.#############",
-    "#.............................#",
-    "###############################"
-]
-
-START_POSITIONS = [(1, 1), (1, 29), (17, 15)]
-GHOST_START_POSITIONS = [(9, 1), (9, 29)]
-
-RED_LINE_EXCLUSION = set([
-    (r, 15) for r in range(1, 18)
-]).union(set([
-    (1, c) for c in range(1, 30)
+
+CELL_SIZE = 30
+PELLET_POINT = 1
+SHARED_ROUTE_PENALTY = 8
+AGENT_SPEED = 10
+MAX_ENERGY = 80
+
+GHOST_SPEED = 10
+LOTTERY_FAIL_CHANCE = 0.8
+ENERGY_LOSS_PER_MOVE = 0.5
+GHOST_CATCH_PENALTY = 10
+GHOST_AVOIDANCE_RADIUS = 2
+
+PELLET_SPAWN_RATIO = 0.3
+SCORE_PER_DEAD_AGENT_THRESHOLD = 1
+FONT_SIZE = 18
+TEXT_CACHE_SIZE = 256             # rendered scoreboard strings kept (LRU)
+
+# Sensing / anticipation
+SENSING_RADIUS = 4
+LOOKAHEAD_STEPS = 2
+
+# Path planning: follow the maze's shared pellet distance field; the per-agent
+# BFS is only used when that route passes a ghost or no pellet is reachable.
+USE_PELLET_DISTANCE_FIELD = True
+
+# Timing runs on the simulation clock (manager.time_step), not wall time, so
+# GUI and headless runs replan identically. 42 ticks = the old 700 ms at 60 FPS.
+PATH_TTL_TICKS = 42
+PULSE_PERIOD_TICKS = 30
+
+# --- STRATEGY 2: Alternating Offers (MODIFIED) ---
+NEGOTIATION_MODE = "alternating_offers"
+MAX_NEGOTIATION_ROUNDS = 3
+
+# === MENTOR FIX: INCREASED WAIT TIMES ===
+LOSER_WAIT_TURNS_SUCCESS = 3      
+FALLBACK_WAIT_TURNS = 5           
+
+LOSER_PENALTY_SUCCESS = 3         # mild score loss on success
+FALLBACK_PENALTY_BOTH = 15        # heavy penalty on timeout/fallback
+
+# Batch config
+MAX_EPISODES = 20
+MAX_EPISODE_STEPS = 20000         # headless safety cap (negotiation livelocks never end)
+
+# GUI pacing (main.py): simulation ticks per second at 1x, display refresh cap, and the
+# share of each 1 / RENDER_FPS frame that may be spent simulating before drawing
+SIM_TICKS_PER_SECOND = 60
+RENDER_FPS = 60
+SPEED_MULTIPLIERS = (1, 8, 64)    # keys 1 / 2 / 3; T toggles uncapped turbo
+SIM_FRAME_BUDGET = 0.8
+
+# Conflict logs / episode summaries (main.py): stream rows to the CSVs from a background
+# writer thread instead of keeping them in memory until S is pressed
+STREAM_LOGS = True
+LOG_BATCH_ROWS = 512              # rows per write call
+LOG_FLUSH_SECONDS = 1.0           # file flush interval
+LOG_MAX_PENDING = 10000           # queued rows before append() waits for the writer
+# "csv", or "columnar" to stream the conflict log as typed column files with
+# dictionary-encoded strings (columnar_log.py, needs NumPy; exports back to CSV)
+CONFLICT_LOG_FORMAT = "csv"
+
+# Colors
+BLACK = (0, 0, 0)
+WALL_COLOR = (40, 40, 50)
+CORRIDOR_FLOOR_COLOR = (60, 60, 80)
+TEXT_COLOR = (255, 255, 255)
+HIGHLIGHT_COLOR = (255, 255, 0)
+
+BAR_WIDTH = 250
+BAR_HEIGHT = 10
+BAR_BG_COLOR = (30, 30, 30)
+BAR_GOOD_COLOR = (0, 180, 0)
+BAR_WARN_COLOR = (255, 165, 0)
+BAR_DANGER_COLOR = (255, 0, 0)
+
+AGENT_COLORS = [(255, 50, 50), (50, 255, 50), (50, 100, 255)]
+GHOST_COLORS = [(255, 150, 150), (150, 255, 150), (150, 150, 255)]
+
+# --- Maze layout ---
+MAZE_LAYOUT = [
+    "###############################",
+    "#.............................#",
+    "###########.###.###############",
+    "#.#........##.#.#.......#.#...#",
+    "#.#.#.#####.#.....###.#.#.###.#",
+    "#.#.#.......#.#.##....#.#.....#",
+    "#.###.#######.#.#####.###.#####",
+    "#...........#.#.#.........#...#",
+    "#######.###.#.#.###.#######.#.#",
+    "#......#....#.#.#...........#.#",
+    "#.#####.###...#.###########.#.#",
+    "#...........#.C.C.........#...#",
+    "#.###########.#.#.###########C#",
+    "#.#.#.........#.#.....#.#.....#",
+    "#.#.#.#########.###.#.#.#.###.#",
+    "#.....#.....#.#.#...#.....#...#",
+    "#.#########.#.#.#.#############",
+    "#.............#.#.............#",
+    "#C###############.#############",
+    "#.............................#",
+    "###############################"
+]
+
+START_POSITIONS = [(1, 1), (1, 29), (17, 15)]
+GHOST_START_POSITIONS = [(9, 1), (9, 29)]
+
+# --- Maze file ---
+# Load the maze from this file (see maze_file.py) instead of MAZE_LAYOUT. Its compiled
+# tables are cached in MAZE_CACHE_DIR next to the file. The window is sized for
+# MAZE_LAYOUT, so bigger mazes are for headless runs.
+MAZE_FILE = None
+MAZE_CACHE_DIR = ".maze_cache"
+
+# --- Scenario size ---
+# The first agents/ghosts start at the cells listed above; any beyond those lists start
+# on distinct walkable cells sampled per episode, and get generated colours once
+# AGENT_COLORS / GHOST_COLORS run out.
+NUM_AGENTS = 3
+NUM_GHOSTS = 2
+
+# Keep agent counters in NumPy columns (agent_store.py) and run the per-tick
+# bookkeeping as array operations. Same results; pays off with many agents.
+USE_AGENT_STORE = False
+
+RED_LINE_EXCLUSION = set([
+    (r, 15) for r in range(1, 18)
+]).union(set([
+    (1, c) for c in range(1, 30)
 ]))
\ No newline at end of file
@@ -0,0 +1,137 @@
+# log_sink.py
+"""Streaming sinks for conflict logs and episode summaries (STREAM_LOGS).
+
+A sink stands in for the log lists: append() only queues the row and a
+background thread writes queued rows in batches, flushing the file every
+LOG_FLUSH_SECONDS. At most LOG_MAX_PENDING rows wait in memory (append() blocks
+beyond that), so memory stays flat however long the batch runs and rows are on
+disk while it is still going.
+"""
+import csv
+import queue
+import threading
+import time
+from config import *
+
+_CLOSE = object()
+
+
+class LogSink:
+    """Queue plus background writer thread; subclasses store the rows.
+
+    Subclasses implement _write_rows(batch), _flush_rows() and _close_rows(), all
+    called on the writer thread only.
+    """
+
+    def __init__(self, filename, batch_rows=LOG_BATCH_ROWS, flush_seconds=LOG_FLUSH_SECONDS,
+                 max_pending=LOG_MAX_PENDING):
+        self.filename = filename
+        self.batch_rows = batch_rows
+        self.flush_seconds = flush_seconds
+        self.rows = 0              # rows appended so far
+        self.closed = False
+        self.error = None          # first exception raised by the writer thread
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name=f"log-sink {filename}",
+                                        daemon=True)
+        self._thread.start()
+
+    def append(self, row):
+        if self.error is not None:
+            raise self.error
+        self.rows += 1
+        self._queue.put(row)
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return self.rows
+
+    def flush(self):
+        """Block until every row appended so far is written and flushed."""
+        if self.closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    # --- writer thread ---
+
+    def _call(self, method, *args):
+        if self.error is not None:
+            return
+        try:
+            method(*args)
+        except Exception as exc:
+            # Surface the failure to the simulation thread; keep draining the queue
+            self.error = exc
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if isinstance(item, dict):
+                batch.append(item)
+                if len(batch) >= self.batch_rows:
+                    self._call(self._write_rows, batch)
+                    batch = []
+                if time.monotonic() < deadline:
+                    continue
+            # Flush interval elapsed, flush() or close(): everything queued goes to disk
+            if batch:
+                self._call(self._write_rows, batch)
+                batch = []
+            self._call(self._flush_rows)
+            deadline = time.monotonic() + self.flush_seconds
+            if item is _CLOSE:
+                try:
+                    self._close_rows()
+                except Exception as exc:
+                    self.error = self.error or exc
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+
+class CsvLogSink(LogSink):
+    def __init__(self, filename, fieldnames, extend_fields=False, **kwargs):
+        self.fieldnames = list(fieldnames)
+        # Add keys of the first row that fieldnames lacks (per-agent summary columns)
+        self.extend_fields = extend_fields
+        self._file = None          # opened with the first row, like save_logs_to_csv
+        self._writer = None
+        super().__init__(filename, **kwargs)
+
+    def _write_rows(self, batch):
+        if self._writer is None:
+            if self.extend_fields:
+                self.fieldnames += [key for key in batch[0] if key not in self.fieldnames]
+            self._file = open(self.filename, "w", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+            self._writer.writeheader()
+        self._writer.writerows(batch)
+
+    def _flush_rows(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def _close_rows(self):
+        if self._file is not None:
+            self._file.close()
@@ -1,291 +1,447 @@
-# main.py
-import pygame
-import random
-import os
-import csv
-from config import *
-from maze import Maze
-from agent import Agent
-from ghost import Ghost
-from conflict_manager import ConflictManager
-
-# --- Global logs ---
-CONFLICT_LOGS = []        
-EPISODE_SUMMARIES = []    
-
-MAZE_ROWS = len(MAZE_LAYOUT)
-MAZE_COLS = len(MAZE_LAYOUT[0])
-MAZE_WIDTH = MAZE_COLS * CELL_SIZE
-SCREEN_HEIGHT = MAZE_ROWS * CELL_SIZE
-BLANK_SPACE_WIDTH = 450
-SCREEN_WIDTH = MAZE_WIDTH + BLANK_SPACE_WIDTH
-
-def draw_scoreboard(screen, font, agents, ghosts, manager, episode_idx, episodes_total, batch_done):
-    panel_x = MAZE_WIDTH + 30
-    title_text = font.render("MULTI-AGENT CHALLENGE", True, TEXT_COLOR)
-    screen.blit(title_text, (MAZE_WIDTH + (BLANK_SPACE_WIDTH / 2) - title_text.get_width() / 2, 20))
-
-    episode_text = font.render(f"Episode {episode_idx}/{episodes_total}", True, (150, 150, 255))
-    screen.blit(episode_text, (panel_x, 40))
-
-    y_offset = 60
-    if batch_done:
-        msg = "BATCH DONE - Press S to save CSV, ENTER for new batch"
-        txt = font.render(msg, True, HIGHLIGHT_COLOR)
-        screen.blit(txt, (panel_x, y_offset))
-        return
-
-    if manager.is_paused:
-        msg = "Press ENTER/SPACE to start batch"
-        color = (255, 150, 150)
-    else:
-        msg = "SIMULATION ACTIVE"
-        color = (150, 255, 150)
-    txt = font.render(msg, True, color)
-    screen.blit(txt, (panel_x, y_offset))
-
-    y_offset = 90
-    for agent in agents:
-        status_color = agent.color if agent.is_active else (50, 50, 50)
-        score_text = font.render(
-            f"Agent {agent.agent_id} ({'A' if agent.is_active else 'D'}):", True, status_color
-        )
-        stats_text = font.render(
-            f"Score:{agent.score} | Energy:{int(agent.energy)} | St:{agent.state}",
-            True, TEXT_COLOR
-        )
-        screen.blit(score_text, (panel_x, y_offset))
-        screen.blit(stats_text, (panel_x, y_offset + 20))
-
-        bar_x = panel_x
-        bar_y = y_offset + 40
-        ratio = agent.energy / MAX_ENERGY
-        bar_w = int(BAR_WIDTH * ratio)
-        if ratio > 0.6:
-            bar_color = BAR_GOOD_COLOR
-        elif ratio > 0.3:
-            bar_color = BAR_WARN_COLOR
-        else:
-            bar_color = BAR_DANGER_COLOR
-        pygame.draw.rect(screen, BAR_BG_COLOR, (bar_x, bar_y, BAR_WIDTH, BAR_HEIGHT))
-        pygame.draw.rect(screen, bar_color, (bar_x, bar_y, bar_w, BAR_HEIGHT))
-
-        y_offset += 65
-
-    y_offset += 20
-    metrics_title = font.render("LIVE METRICS:", True, (150, 150, 255))
-    screen.blit(metrics_title, (panel_x, y_offset))
-    y_offset += 30
-
-    c_text = font.render(f"Post-move Conflicts: {manager.conflict_count}", True, TEXT_COLOR)
-    s_text = font.render(f"Negotiations (successes): {manager.negotiation_success}", True, TEXT_COLOR)
-    l_text = font.render(f"Lock Conflicts: {manager.lock_conflict_events}", True, TEXT_COLOR)
-    p_text = font.render(f"Predicted Conflicts: {manager.predicted_conflict_events}", True, TEXT_COLOR)
-    screen.blit(c_text, (panel_x, y_offset))
-    screen.blit(s_text, (panel_x, y_offset + 20))
-    screen.blit(l_text, (panel_x, y_offset + 40))
-    screen.blit(p_text, (panel_x, y_offset + 60))
-
-
-def reset_game(screen, episode_id, log_list):
-    random.seed(pygame.time.get_ticks())
-    maze = Maze(screen)
-    agents_list = [
-        Agent(1, AGENT_COLORS[0], START_POSITIONS[0][0], START_POSITIONS[0][1], maze, None),
-        Agent(2, AGENT_COLORS[1], START_POSITIONS[1][0], START_POSITIONS[1][1], maze, None),
-        Agent(3, AGENT_COLORS[2], START_POSITIONS[2][0], START_POSITIONS[2][1], maze, None)
-    ]
-    ghosts_list = [
-        Ghost(1, GHOST_COLORS[0], GHOST_START_POSITIONS[0][0], GHOST_START_POSITIONS[0][1], maze),
-        Ghost(2, GHOST_COLORS[1], GHOST_START_POSITIONS[1][0], GHOST_START_POSITIONS[1][1], maze)
-    ]
-    manager = ConflictManager(maze, agents_list, ghosts_list, episode_id, log_list)
-    manager.is_paused = True
-    for a in agents_list:
-        a.manager = manager
-        if (a.row, a.col) in maze.shared_route_cells:
-            manager.lock(a, (a.row, a.col))
-    print(f"--- EPISODE {episode_id} READY ---")
-    return maze, agents_list, ghosts_list, manager
-
-
-def save_logs_to_csv(logs, filename="alternating_offers_conflicts_log.csv"):
-    # Per-conflict logs
-    if not logs:
-        print("No conflict logs to save.")
-    else:
-        fieldnames = [
-            "episode", "time_step", "strategy", "conflict_type",
-            "winner_id", "loser_id", "loser_wait_turns",
-            "negotiation_rounds", "final_outcome",
-            "corridor_row", "corridor_col"
-        ]
-        with open(filename, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in logs:
-                writer.writerow(row)
-        print(f"Saved {len(logs)} conflict records to {filename}")
-
-    # Per-episode summaries
-    if not EPISODE_SUMMARIES:
-        print("No episode summaries to save.")
-    else:
-        ep_fieldnames = [
-            "episode",
-            "post_move_conflicts",
-            "pre_move_conflicts",
-            "negotiations",
-            "predicted_conflicts",
-            "lock_conflicts",
-            "avg_loser_wait",
-            "agent1_score",
-            "agent2_score",
-            "agent3_score"
-        ]
-        with open("alternating_offers_episode_summary.csv", "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=ep_fieldnames)
-            writer.writeheader()
-            for row in EPISODE_SUMMARIES:
-                writer.writerow(row)
-        print(f"Saved {len(EPISODE_SUMMARIES)} episode summaries to alternating_offers_episode_summary.csv")
-
-
-def main():
-    os.environ['SDL_VIDEO_CENTERED'] = '1'
-    pygame.init()
-    try:
-        font = pygame.font.Font(None, FONT_SIZE)
-    except pygame.error:
-        print("Warning: Pygame font initialization failed.")
-        font = None
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Multi-Agent Pac-Men (Alternating Offers)")
-
-    episodes_completed = 1
-    maze, agents_list, ghosts_list, manager = reset_game(screen, episodes_completed, CONFLICT_LOGS)
-    manager.is_paused = True
-    running_simulation = False
-    batch_done = False
-
-    print("--- Press ENTER/SPACE once to run 50 episodes (Alternating Offers) ---")
-
-    running = True
-    clock = pygame.time.Clock()
-
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key in (pygame.K_RETURN, pygame.K_SPACE):
-                    if batch_done:
-                        batch_done = False
-                        episodes_completed = 1
-                        CONFLICT_LOGS.clear()
-                        EPISODE_SUMMARIES.clear()
-                        maze, agents_list, ghosts_list, manager = reset_game(
-                            screen, episodes_completed, CONFLICT_LOGS
-                        )
-                        manager.is_paused = False
-                        running_simulation = True
-                        print("--- New Alternating-Offers batch started ---")
-                    else:
-                        manager.is_paused = False
-                        running_simulation = True
-                        print("--- Batch running (Alternating Offers) ---")
-                if event.key == pygame.K_s:
-                    save_logs_to_csv(CONFLICT_LOGS)
-
-        if running_simulation and not manager.is_paused and not batch_done:
-            manager.time_step += 1
-
-            # Negotiation rounds first
-            manager.process_negotiations()
-
-            for ghost in ghosts_list:
-                ghost.decide_next_move(agents_list)
-            manager.update_ghost_positions()
-
-            for agent in agents_list:
-                agent.decide_next_move()
-            manager.resolve_path_conflicts(agents_list)
-            manager.check_ghost_collisions(agents_list)
-
-            active_agents = [a for a in agents_list if a.is_active]
-            game_over = False
-
-            if len(active_agents) == 1:
-                survivor = active_agents[0]
-                dead_count = len(agents_list) - 1
-                threshold = dead_count * SCORE_PER_DEAD_AGENT_THRESHOLD
-                if survivor.score >= threshold:
-                    game_over = True
-            if not maze.pellets:
-                game_over = True
-            if not active_agents:
-                game_over = True
-
-            if game_over:
-                current_episode = episodes_completed
-
-                if manager.total_conflicts_with_wait > 0:
-                    avg_loser_wait = (
-                        manager.total_loser_wait_time /
-                        manager.total_conflicts_with_wait
-                    )
-                else:
-                    avg_loser_wait = 0.0
-
-                summary_row = {
-                    "episode": current_episode,
-                    "post_move_conflicts": manager.conflict_count,
-                    "pre_move_conflicts": manager.total_conflicts_with_wait,
-                    "negotiations": manager.negotiation_success,
-                    "predicted_conflicts": manager.predicted_conflict_events,
-                    "lock_conflicts": manager.lock_conflict_events,
-                    "avg_loser_wait": avg_loser_wait,
-                    "agent1_score": agents_list[0].score,
-                    "agent2_score": agents_list[1].score,
-                    "agent3_score": agents_list[2].score
-                }
-                EPISODE_SUMMARIES.append(summary_row)
-
-                print(f"Episode {current_episode} finished.")
-                episodes_completed += 1
-                if episodes_completed <= MAX_EPISODES:
-                    maze, agents_list, ghosts_list, manager = reset_game(
-                        screen, episodes_completed, CONFLICT_LOGS
-                    )
-                    manager.is_paused = False
-                else:
-                    batch_done = True
-                    running_simulation = False
-                    manager.is_paused = True
-                    print("=== Alternating-Offers batch of 50 episodes completed. "
-                          "Press 'S' to save CSV, ENTER for new batch. ===")
-
-        screen.fill(BLACK)
-        maze.draw_maze(manager)
-        for ghost in ghosts_list:
-            ghost.draw(screen)
-        for agent in agents_list:
-            agent.draw(screen)
-
-        if font:
-            draw_scoreboard(screen, font, agents_list, ghosts_list, manager,
-                            min(episodes_completed, MAX_EPISODES), MAX_EPISODES, batch_done)
-
-        pygame.draw.line(screen, (50, 50, 50), (MAZE_WIDTH, 0), (MAZE_WIDTH, SCREEN_HEIGHT), 2)
-        pygame.display.flip()
-
-        if running_simulation and not manager.is_paused and not batch_done:
-            clock.tick(60)
-        else:
-            pygame.time.wait(10)
-
-    pygame.quit()
-
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+# main.py
+import pygame
+import argparse
+import os
+import csv
+import functools
+import time
+from config import *
+from simulation import Simulation
+from log_sink import CsvLogSink
+from columnar_log import ColumnarLogSink
+from maze_file import load_maze
+from profiler import TickProfiler
+from seeding import derive_episode_seed, load_manifest, new_batch_seed, write_manifest
+
+# --- Global logs ---
+CONFLICT_LOGS = []        
+EPISODE_SUMMARIES = []    
+CONFLICT_LOG_FILE = "alternating_offers_conflicts_log.csv"
+EPISODE_SUMMARY_FILE = "alternating_offers_episode_summary.csv"
+CONFLICT_COLUMNS_DIR = "alternating_offers_conflicts_log.columns"     # CONFLICT_LOG_FORMAT = "columnar"
+CONFLICT_LOG_FIELDS = [
+    "episode", "time_step", "strategy", "conflict_type",
+    "winner_id", "loser_id", "loser_wait_turns",
+    "negotiation_rounds", "final_outcome",
+    "corridor_row", "corridor_col"
+]
+# Per-agent score columns are appended after these
+EPISODE_SUMMARY_FIELDS = [
+    "episode",
+    "post_move_conflicts",
+    "pre_move_conflicts",
+    "negotiations",
+    "predicted_conflicts",
+    "lock_conflicts",
+    "avg_loser_wait"
+]
+MANIFEST_FILE = "alternating_offers_manifest.json"
+PROFILE_FILE = "alternating_offers_profile.json"
+
+MAZE_ROWS = len(MAZE_LAYOUT)
+MAZE_COLS = len(MAZE_LAYOUT[0])
+MAZE_WIDTH = MAZE_COLS * CELL_SIZE
+SCREEN_HEIGHT = MAZE_ROWS * CELL_SIZE
+BLANK_SPACE_WIDTH = 450
+SCREEN_WIDTH = MAZE_WIDTH + BLANK_SPACE_WIDTH
+# Agent rows that fit above the live metrics (65 px each)
+SCOREBOARD_AGENT_ROWS = max(1, (SCREEN_HEIGHT - 230) // 65)
+SPEED_KEYS = (pygame.K_1, pygame.K_2, pygame.K_3)
+# Scoreboard plus the divider line; redrawn only when scoreboard_state() changes
+PANEL_RECT = pygame.Rect(MAZE_WIDTH, 0, BLANK_SPACE_WIDTH, SCREEN_HEIGHT)
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(font, text, color):
+    """font.render(text, True, color), cached with least-recently-used eviction."""
+    return font.render(text, True, color)
+
+
+def scoreboard_state(agents, manager, episode_idx, episodes_total, batch_done, profile_lines=()):
+    """Every value draw_scoreboard shows; the panel is redrawn only when this changes."""
+    return (
+        episode_idx, episodes_total, batch_done, manager.is_paused, len(agents),
+        tuple((agent.agent_id, agent.is_active, agent.score, agent.energy, agent.state)
+              for agent in agents[:SCOREBOARD_AGENT_ROWS]),
+        manager.conflict_count, manager.negotiation_success,
+        manager.lock_conflict_events, manager.predicted_conflict_events, profile_lines,
+    )
+
+
+def draw_profile(screen, font, lines, x, y):
+    """Tick profile overlay (P, with --profile): the last finished episode."""
+    screen.blit(render_text(font, "TICK PROFILE (last episode):", (150, 150, 255)), (x, y))
+    for i, line in enumerate(lines):
+        screen.blit(render_text(font, line, TEXT_COLOR), (x, y + 25 + i * 18))
+
+
+def draw_scoreboard(screen, font, agents, ghosts, manager, episode_idx, episodes_total, batch_done,
+                    profile_lines=()):
+    panel_x = MAZE_WIDTH + 30
+    title_text = render_text(font, "MULTI-AGENT CHALLENGE", TEXT_COLOR)
+    screen.blit(title_text, (MAZE_WIDTH + (BLANK_SPACE_WIDTH / 2) - title_text.get_width() / 2, 20))
+
+    episode_text = render_text(font, f"Episode {episode_idx}/{episodes_total}", (150, 150, 255))
+    screen.blit(episode_text, (panel_x, 40))
+
+    y_offset = 60
+    if batch_done:
+        msg = "BATCH DONE - Press S to save CSV, ENTER for new batch"
+        txt = render_text(font, msg, HIGHLIGHT_COLOR)
+        screen.blit(txt, (panel_x, y_offset))
+        if profile_lines:
+            draw_profile(screen, font, profile_lines, panel_x, 90)
+        return
+
+    if manager.is_paused:
+        msg = "Press ENTER/SPACE to start batch"
+        color = (255, 150, 150)
+    else:
+        msg = "SIMULATION ACTIVE"
+        color = (150, 255, 150)
+    txt = render_text(font, msg, color)
+    screen.blit(txt, (panel_x, y_offset))
+    if profile_lines:
+        draw_profile(screen, font, profile_lines, panel_x, 90)
+        return
+
+    y_offset = 90
+    for agent in agents[:SCOREBOARD_AGENT_ROWS]:
+        status_color = agent.color if agent.is_active else (50, 50, 50)
+        score_text = render_text(
+            font,
+            f"Agent {agent.agent_id} ({'A' if agent.is_active else 'D'}):", status_color
+        )
+        stats_text = render_text(
+            font,
+            f"Score:{agent.score} | Energy:{int(agent.energy)} | St:{agent.state}",
+            TEXT_COLOR
+        )
+        screen.blit(score_text, (panel_x, y_offset))
+        screen.blit(stats_text, (panel_x, y_offset + 20))
+
+        bar_x = panel_x
+        bar_y = y_offset + 40
+        ratio = agent.energy / MAX_ENERGY
+        bar_w = int(BAR_WIDTH * ratio)
+        if ratio > 0.6:
+            bar_color = BAR_GOOD_COLOR
+        elif ratio > 0.3:
+            bar_color = BAR_WARN_COLOR
+        else:
+            bar_color = BAR_DANGER_COLOR
+        pygame.draw.rect(screen, BAR_BG_COLOR, (bar_x, bar_y, BAR_WIDTH, BAR_HEIGHT))
+        pygame.draw.rect(screen, bar_color, (bar_x, bar_y, bar_w, BAR_HEIGHT))
+
+        y_offset += 65
+
+    if len(agents) > SCOREBOARD_AGENT_ROWS:
+        more_text = render_text(font, f"+{len(agents) - SCOREBOARD_AGENT_ROWS} more agents", TEXT_COLOR)
+        screen.blit(more_text, (panel_x, y_offset))
+        y_offset += 20
+
+    y_offset += 20
+    metrics_title = render_text(font, "LIVE METRICS:", (150, 150, 255))
+    screen.blit(metrics_title, (panel_x, y_offset))
+    y_offset += 30
+
+    c_text = render_text(font, f"Post-move Conflicts: {manager.conflict_count}", TEXT_COLOR)
+    s_text = render_text(font, f"Negotiations (successes): {manager.negotiation_success}", TEXT_COLOR)
+    l_text = render_text(font, f"Lock Conflicts: {manager.lock_conflict_events}", TEXT_COLOR)
+    p_text = render_text(font, f"Predicted Conflicts: {manager.predicted_conflict_events}", TEXT_COLOR)
+    screen.blit(c_text, (panel_x, y_offset))
+    screen.blit(s_text, (panel_x, y_offset + 20))
+    screen.blit(l_text, (panel_x, y_offset + 40))
+    screen.blit(p_text, (panel_x, y_offset + 60))
+
+
+def save_logs_to_csv(logs, filename=CONFLICT_LOG_FILE, summaries=None,
+                     summary_filename=EPISODE_SUMMARY_FILE):
+    # Per-conflict logs
+    if not logs:
+        print("No conflict logs to save.")
+    else:
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CONFLICT_LOG_FIELDS)
+            writer.writeheader()
+            for row in logs:
+                writer.writerow(row)
+        print(f"Saved {len(logs)} conflict records to {filename}")
+
+    # Per-episode summaries
+    if summaries is None:
+        summaries = EPISODE_SUMMARIES
+    if not summaries:
+        print("No episode summaries to save.")
+    else:
+        ep_fieldnames = list(EPISODE_SUMMARY_FIELDS)
+        # Per-agent score columns depend on NUM_AGENTS
+        for row in summaries:
+            for key in row:
+                if key not in ep_fieldnames:
+                    ep_fieldnames.append(key)
+        with open(summary_filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=ep_fieldnames)
+            writer.writeheader()
+            for row in summaries:
+                writer.writerow(row)
+        print(f"Saved {len(summaries)} episode summaries to {summary_filename}")
+
+
+def open_log_sinks(out_dir="."):
+    """Streaming replacements for CONFLICT_LOGS / EPISODE_SUMMARIES (STREAM_LOGS)."""
+    if CONFLICT_LOG_FORMAT == "columnar":
+        logs = ColumnarLogSink(os.path.join(out_dir, CONFLICT_COLUMNS_DIR))
+    else:
+        logs = CsvLogSink(os.path.join(out_dir, CONFLICT_LOG_FILE), CONFLICT_LOG_FIELDS)
+    return (logs,
+            CsvLogSink(os.path.join(out_dir, EPISODE_SUMMARY_FILE), EPISODE_SUMMARY_FIELDS,
+                       extend_fields=True))
+
+
+def close_log_sinks(logs, summaries):
+    """Write out whatever is still queued; reports like save_logs_to_csv.
+
+    Sinks closed earlier (at the end of a GUI batch) are skipped.
+    """
+    for sink, what in ((logs, "conflict records"), (summaries, "episode summaries")):
+        if sink.closed:
+            continue
+        sink.close()
+        if len(sink):
+            print(f"Saved {len(sink)} {what} to {sink.filename}")
+        else:
+            print(f"No {what.replace('records', 'logs')} to save.")
+
+
+def run_headless(episodes=MAX_EPISODES, batch_seed=None, manifest=None, verbose=False,
+                 profile=False, maze_file=None):
+    seeds = None
+    first_episode = 1
+    if manifest is not None:
+        recorded = load_manifest(manifest)
+        batch_seed = recorded["batch_seed"]
+        seeds = recorded["episode_seeds"]
+        first_episode = recorded["first_episode"]
+    if STREAM_LOGS:
+        logs, summaries = open_log_sinks()
+    else:
+        logs, summaries = CONFLICT_LOGS, EPISODE_SUMMARIES
+    profiler = TickProfiler() if profile else None
+    layout = load_maze(maze_file) if maze_file else None
+    sim = Simulation(logs, summaries, verbose=verbose, profiler=profiler, layout=layout)
+    try:
+        sim.run_batch(episodes, seeds=seeds, first_episode=first_episode, batch_seed=batch_seed)
+    finally:
+        if STREAM_LOGS:
+            close_log_sinks(logs, summaries)
+    print(f"=== Headless Alternating-Offers batch of {len(sim.episode_seeds)} episodes completed "
+          f"(batch seed {sim.batch_seed}). ===")
+    if not STREAM_LOGS:
+        save_logs_to_csv(CONFLICT_LOGS)
+    write_manifest(MANIFEST_FILE, sim.batch_seed, sim.episode_seeds, first_episode)
+    if profiler is not None:
+        for line in profiler.summary_lines():
+            print(line)
+        profiler.write_report(PROFILE_FILE)
+
+
+def speed_label(speed, turbo):
+    return "turbo" if turbo else f"{speed}x"
+
+
+def main(profile=False):
+    os.environ['SDL_VIDEO_CENTERED'] = '1'
+    pygame.init()
+    try:
+        font = pygame.font.Font(None, FONT_SIZE)
+    except pygame.error:
+        print("Warning: Pygame font initialization failed.")
+        font = None
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Multi-Agent Pac-Men (Alternating Offers)")
+
+    if STREAM_LOGS:
+        logs, summaries = open_log_sinks()
+    else:
+        logs, summaries = CONFLICT_LOGS, EPISODE_SUMMARIES
+    profiler = TickProfiler() if profile else None
+    show_profile = False
+    sim = Simulation(logs, summaries, screen=screen, verbose=True, profiler=profiler)
+    batch_seed = new_batch_seed()
+    episodes_completed = 1
+    sim.reset(episodes_completed, seed=derive_episode_seed(batch_seed, episodes_completed))
+    running_simulation = False
+    batch_done = False
+
+    print("--- Press ENTER/SPACE once to run 50 episodes (Alternating Offers) ---")
+
+    running = True
+    clock = pygame.time.Clock()
+    sprite_rects = []
+    panel_state = None
+
+    # Fixed timestep: wall time banks ticks at SIM_TICKS_PER_SECOND * speed and each frame
+    # pays them out for at most SIM_FRAME_BUDGET of a frame; turbo ticks for the whole budget
+    speed = SPEED_MULTIPLIERS[0]
+    turbo = False
+    frame_budget = SIM_FRAME_BUDGET / RENDER_FPS
+    ticks_due = 0.0
+    last_frame = time.perf_counter()
+
+    def advance(max_steps):
+        """Skip idle ticks up to max_steps, play one tick, roll over finished episodes.
+
+        Returns the number of ticks consumed.
+        """
+        nonlocal episodes_completed, batch_done, running_simulation
+        ticks = sim.skip_idle_ticks(max_steps) + 1
+        if sim.step():
+            print(f"Episode {episodes_completed} finished.")
+            episodes_completed += 1
+            if episodes_completed <= MAX_EPISODES:
+                sim.reset(episodes_completed,
+                          seed=derive_episode_seed(batch_seed, episodes_completed))
+                sim.manager.is_paused = False
+            else:
+                batch_done = True
+                running_simulation = False
+                if STREAM_LOGS:
+                    close_log_sinks(logs, summaries)
+                if profiler is not None:
+                    profiler.write_report(PROFILE_FILE)
+                sim.manager.is_paused = True
+                print("=== Alternating-Offers batch of 50 episodes completed. "
+                      "Press 'S' to save CSV, ENTER for new batch. ===")
+        return ticks
+
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_RETURN, pygame.K_SPACE):
+                    if batch_done:
+                        batch_done = False
+                        batch_seed = new_batch_seed()
+                        episodes_completed = 1
+                        if STREAM_LOGS:
+                            logs, summaries = open_log_sinks()
+                            sim.log_list, sim.summary_list = logs, summaries
+                        else:
+                            CONFLICT_LOGS.clear()
+                            EPISODE_SUMMARIES.clear()
+                        sim.reset(episodes_completed,
+                                  seed=derive_episode_seed(batch_seed, episodes_completed))
+                        sim.manager.is_paused = False
+                        running_simulation = True
+                        print("--- New Alternating-Offers batch started ---")
+                    else:
+                        sim.manager.is_paused = False
+                        running_simulation = True
+                        print("--- Batch running (Alternating Offers) ---")
+                if event.key == pygame.K_s:
+                    if STREAM_LOGS and logs.closed:
+                        # The finished batch already closed (and reported) its sinks
+                        print(f"{len(logs)} conflict records already saved to {logs.filename}")
+                    elif STREAM_LOGS:
+                        # Rows are already streaming to the CSVs; just push out the queue
+                        logs.flush()
+                        summaries.flush()
+                        print(f"{len(logs)} conflict records streamed to {logs.filename}")
+                    else:
+                        save_logs_to_csv(CONFLICT_LOGS)
+                    seeds = [derive_episode_seed(batch_seed, e)
+                             for e in range(1, len(summaries) + 1)]
+                    write_manifest(MANIFEST_FILE, batch_seed, seeds)
+                if event.key == pygame.K_p and profiler is not None:
+                    show_profile = not show_profile
+                if event.key in SPEED_KEYS or event.key == pygame.K_t:
+                    if event.key == pygame.K_t:
+                        turbo = not turbo
+                    else:
+                        speed = SPEED_MULTIPLIERS[SPEED_KEYS.index(event.key)]
+                        turbo = False
+                    ticks_due = 0.0
+                    pygame.display.set_caption(
+                        f"Multi-Agent Pac-Men (Alternating Offers) - {speed_label(speed, turbo)}")
+                    print(f"--- Speed: {speed_label(speed, turbo)} ---")
+
+        now = time.perf_counter()
+        elapsed = now - last_frame
+        last_frame = now
+        if running_simulation and not sim.manager.is_paused and not batch_done:
+            deadline = now + frame_budget
+            if turbo:
+                while not batch_done and time.perf_counter() < deadline:
+                    advance(None)
+            else:
+                ticks_due += elapsed * speed * SIM_TICKS_PER_SECOND
+                while ticks_due >= 1 and not batch_done and time.perf_counter() < deadline:
+                    ticks_due -= advance(sim.manager.time_step + int(ticks_due))
+                # Ticks that did not fit in the budget are dropped instead of piling up
+                ticks_due = min(ticks_due, 1.0)
+
+        if profiler is not None:
+            render_start = time.perf_counter()
+        # Only the maze cells that changed, the sprites' old and new cells and the
+        # panel are pushed to the display
+        dirty = sim.maze.draw_maze(sim.manager)
+        dirty += sprite_rects
+        sprite_rects = [sim.maze.cell_rect(e.row, e.col) for e in sim.ghosts + sim.agents]
+        dirty += sprite_rects
+        for ghost in sim.ghosts:
+            ghost.draw(screen)
+        for agent in sim.agents:
+            agent.draw(screen)
+
+        episode_idx = min(episodes_completed, MAX_EPISODES)
+        profile_lines = ()
+        if show_profile:
+            profile_lines = tuple(profiler.summary_lines()) or ("(no finished episode yet)",)
+        state = scoreboard_state(sim.agents, sim.manager, episode_idx, MAX_EPISODES, batch_done,
+                                 profile_lines)
+        if state != panel_state:
+            panel_state = state
+            screen.fill(BLACK, PANEL_RECT)
+            if font:
+                draw_scoreboard(screen, font, sim.agents, sim.ghosts, sim.manager,
+                                episode_idx, MAX_EPISODES, batch_done, profile_lines)
+            pygame.draw.line(screen, (50, 50, 50), (MAZE_WIDTH, 0), (MAZE_WIDTH, SCREEN_HEIGHT), 2)
+            dirty.append(PANEL_RECT)
+        pygame.display.update(dirty)
+        if profiler is not None:
+            profiler.record("render", time.perf_counter() - render_start)
+
+        if running_simulation and not sim.manager.is_paused and not batch_done:
+            clock.tick(RENDER_FPS)
+        else:
+            pygame.time.wait(10)
+
+    if STREAM_LOGS:
+        close_log_sinks(logs, summaries)
+    if profiler is not None and profiler.episodes:
+        profiler.write_report(PROFILE_FILE)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-Agent Pac-Men (Alternating Offers)")
+    parser.add_argument("--headless", action="store_true",
+                        help="run the batch without a window at full CPU speed and save the CSVs")
+    parser.add_argument("--episodes", type=int, default=MAX_EPISODES)
+    parser.add_argument("--seed", type=int, default=None,
+                        help="batch seed; each episode's seed is derived from it (default: random)")
+    parser.add_argument("--manifest", default=None,
+                        help="replay the seeds recorded in a manifest written by an earlier run")
+    parser.add_argument("--profile", action="store_true",
+                        help="time every tick phase and save per-episode p50/p95/max to "
+                             f"{PROFILE_FILE} (P toggles the overlay in the window)")
+    parser.add_argument("--maze", default=None,
+                        help="headless: load the maze from this file (see maze_file.py) "
+                             "instead of MAZE_FILE / MAZE_LAYOUT")
+    args = parser.parse_args()
+    if args.headless:
+        run_headless(args.episodes, args.seed, args.manifest, profile=args.profile,
+                     maze_file=args.maze)
+    else:
+        main(profile=args.profile)
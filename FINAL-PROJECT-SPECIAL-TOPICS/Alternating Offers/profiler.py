@@ -0,0 +1,239 @@
+# profiler.py
+"""Per-phase tick timings and work counters (--profile).
+
+TickProfiler wraps the phase methods of a Simulation, and of each episode's
+manager and agents, with timing shims set as instance attributes. Without a
+profiler nothing is wrapped, so the phases run exactly as before and cost nothing
+extra.
+
+Every phase is summed over a step() and kept as one sample per step (ticks that
+skip_idle_ticks() jumps over are in idle_skip; render gets one sample per frame).
+At episode end the samples are reduced to count / total / p50 / p95 / max in
+milliseconds next to the episode's counters. write_report() saves every episode
+as JSON.
+"""
+import json
+import time
+from config import *
+
+# Method name -> phase name, per owner. Phases that a strategy lacks (no
+# process_negotiations in the baseline) are simply not reported. bfs and
+# priority_conflicts run inside agents.
+SIMULATION_PHASES = {
+    "step": "tick",
+    "skip_idle_ticks": "idle_skip",
+    "move_ghosts": "ghosts",
+    "decide_agents": "agents",
+}
+MANAGER_PHASES = {
+    "process_negotiations": "negotiations",
+    "handle_priority_conflict": "priority_conflicts",
+    "resolve_path_conflicts": "path_conflicts",
+    "check_ghost_collisions": "ghost_collisions",
+}
+AGENT_PHASES = {
+    "bfs_find_path": "bfs",
+}
+PHASE_ORDER = ("tick", "idle_skip", "negotiations", "ghosts", "agents", "bfs",
+               "priority_conflicts", "path_conflicts", "ghost_collisions", "render")
+
+# Method name -> counter bumped on every call
+MANAGER_COUNTERS = {
+    "lock": "lock_ops",
+    "unlock": "lock_ops",
+    "_rebuild_danger_map": "danger_map_rebuilds",
+}
+AGENT_COUNTERS = {
+    "is_cell_dangerous": "danger_checks",
+}
+COUNTER_ORDER = ("replans", "bfs_expansions", "danger_checks", "danger_map_rebuilds",
+                 "lock_ops")
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+def phase_stats(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "total_ms": sum(ordered) * 1000,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p95_ms": percentile(ordered, 0.95) * 1000,
+        "max_ms": (ordered[-1] if ordered else 0.0) * 1000,
+    }
+
+
+class TickProfiler:
+    def __init__(self):
+        self.tick_times = {}       # phase -> seconds so far in the current tick
+        self.samples = {}          # phase -> per-tick seconds, current episode
+        self.counters = dict.fromkeys(COUNTER_ORDER, 0)
+        self.episodes = []         # one report record per finished episode
+        self.last_episode = None
+        self.in_step = False
+        self.finished = None       # (episode_id, ticks) of an episode ending in this tick
+
+    # --- wrapping ---
+
+    def _timed(self, phase, method):
+        tick_times = self.tick_times
+        tick_times.setdefault(phase, 0.0)
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                tick_times[phase] += perf_counter() - start
+
+        return timed
+
+    def _counted(self, counter, method):
+        counters = self.counters
+
+        def counted(*args, **kwargs):
+            counters[counter] += 1
+            return method(*args, **kwargs)
+
+        return counted
+
+    def _wrap(self, owner, phases=None, counters=None):
+        # A wrapper is an instance attribute; objects reused across episodes keep theirs
+        for name, phase in (phases or {}).items():
+            method = getattr(owner, name, None)
+            if method is not None and name not in vars(owner):
+                setattr(owner, name, self._timed(phase, method))
+        for name, counter in (counters or {}).items():
+            method = getattr(owner, name, None)
+            if method is not None and name not in vars(owner):
+                setattr(owner, name, self._counted(counter, method))
+
+    def instrument(self, sim):
+        """Wrap the Simulation's own phases; called once by Simulation.__init__."""
+        self._wrap(sim, {name: phase for name, phase in SIMULATION_PHASES.items()
+                         if name != "step"})
+        step = self._timed("tick", sim.step)
+        finish_episode = sim.finish_episode
+
+        def profiled_step():
+            self.in_step = True
+            try:
+                done = step()
+            finally:
+                self.in_step = False
+            self.end_tick()
+            if self.finished is not None:
+                self.end_episode(*self.finished)
+            return done
+
+        def profiled_finish_episode():
+            finish_episode()
+            # Inside step() the episode closes only after its last tick is sampled
+            self.finished = (sim.episode_id, sim.manager.time_step)
+            if not self.in_step:
+                self.end_episode(*self.finished)
+
+        sim.step = profiled_step
+        sim.finish_episode = profiled_finish_episode
+
+    def instrument_episode(self, sim):
+        """Wrap the manager and agents of the episode Simulation.reset() just set up."""
+        self._wrap(sim.manager, MANAGER_PHASES, MANAGER_COUNTERS)
+        for agent in sim.agents:
+            self._wrap(agent, counters=AGENT_COUNTERS)
+            if "bfs_find_path" not in vars(agent):
+                agent.bfs_find_path = self._bfs(agent, agent.bfs_find_path)
+
+    def _bfs(self, agent, method):
+        timed = self._timed(AGENT_PHASES["bfs_find_path"], method)
+        counters = self.counters
+        maze = agent.maze
+
+        def profiled_bfs():
+            expanded = maze.bfs_expanded
+            checks = maze.bfs_danger_checks
+            path = timed()
+            counters["replans"] += 1
+            # The fallback BFS counts its own work; its inline danger_map reads are
+            # danger checks just like is_cell_dangerous() calls
+            counters["bfs_expansions"] += maze.bfs_expanded - expanded
+            counters["danger_checks"] += maze.bfs_danger_checks - checks
+            return path
+
+        return profiled_bfs
+
+    # --- samples ---
+
+    def end_tick(self):
+        for phase, seconds in self.tick_times.items():
+            self.samples.setdefault(phase, []).append(seconds)
+            self.tick_times[phase] = 0.0
+
+    def record(self, phase, seconds):
+        """One sample for a phase timed by the caller (rendering, once per frame)."""
+        self.samples.setdefault(phase, []).append(seconds)
+
+    def end_episode(self, episode_id, ticks):
+        phases = {phase: phase_stats(self.samples[phase])
+                  for phase in PHASE_ORDER if phase in self.samples}
+        self.last_episode = {
+            "episode": episode_id,
+            "ticks": ticks,
+            "phases": phases,
+            "counters": dict(self.counters),
+        }
+        self.episodes.append(self.last_episode)
+        self.finished = None
+        self.samples = {}
+        for counter in self.counters:
+            self.counters[counter] = 0
+
+    # --- report ---
+
+    def overall(self):
+        """Totals over every finished episode (max_ms is the worst single sample)."""
+        phases = {}
+        for record in self.episodes:
+            for phase, stats in record["phases"].items():
+                total = phases.setdefault(phase, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                total["count"] += stats["count"]
+                total["total_ms"] += stats["total_ms"]
+                total["max_ms"] = max(total["max_ms"], stats["max_ms"])
+        for total in phases.values():
+            total["mean_ms"] = total["total_ms"] / total["count"] if total["count"] else 0.0
+        counters = dict.fromkeys(COUNTER_ORDER, 0)
+        for record in self.episodes:
+            for counter, value in record["counters"].items():
+                counters[counter] += value
+        return {"phases": phases, "counters": counters}
+
+    def write_report(self, path):
+        report = {
+            "strategy": NEGOTIATION_MODE,
+            "use_agent_store": USE_AGENT_STORE,
+            "num_agents": NUM_AGENTS,
+            "num_ghosts": NUM_GHOSTS,
+            "overall": self.overall(),
+            "episodes": self.episodes,
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Saved tick profile of {len(self.episodes)} episodes to {path}")
+
+    def summary_lines(self, record=None):
+        """Text lines for the console or the GUI overlay: one per phase, then per counter."""
+        record = record or self.last_episode
+        if record is None:
+            return []
+        lines = [f"{phase:<18} p50 {stats['p50_ms']:6.3f}  p95 {stats['p95_ms']:6.3f}  "
+                 f"max {stats['max_ms']:7.3f} ms"
+                 for phase, stats in record["phases"].items()]
+        lines += [f"{counter}: {value}" for counter, value in record["counters"].items() if value]
+        return lines
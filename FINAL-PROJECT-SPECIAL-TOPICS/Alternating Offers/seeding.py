@@ -0,0 +1,73 @@
+# seeding.py
+import json
+import random
+import config
+
+
+def new_batch_seed():
+    return random.SystemRandom().getrandbits(32)
+
+
+def derive_episode_seed(batch_seed, episode_id):
+    """Seed for one episode of a batch; does not depend on how many episodes the batch has."""
+    return random.Random(f"{batch_seed}:episode:{episode_id}").getrandbits(32)
+
+
+def derive_episode_seeds(batch_seed, episodes, first_episode=1):
+    return [derive_episode_seed(batch_seed, first_episode + i) for i in range(episodes)]
+
+
+class EpisodeRNG:
+    """Independent random streams for one episode, all derived from a single seed."""
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.maze = random.Random(f"{seed}:maze")            # pellet placement
+        self.agents = random.Random(f"{seed}:agents")        # BFS / wander direction shuffles
+        self.ghosts = random.Random(f"{seed}:ghosts")        # ghost move choice
+        self.conflicts = random.Random(f"{seed}:conflicts")  # conflict lotteries
+        self.starts = random.Random(f"{seed}:starts")        # sampled start cells
+
+
+def _jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(_jsonable(v) for v in value)
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    return value
+
+
+def config_snapshot():
+    """All upper-case settings from config.py in JSON-friendly form."""
+    return {name: _jsonable(getattr(config, name)) for name in dir(config) if name.isupper()}
+
+
+def write_manifest(path, batch_seed, episode_seeds, first_episode=1, configs=None):
+    """Record everything needed to replay a batch: seeds plus the config of each strategy."""
+    if configs is None:
+        configs = {config.NEGOTIATION_MODE: config_snapshot()}
+    manifest = {
+        "batch_seed": batch_seed,
+        "first_episode": first_episode,
+        "episode_seeds": list(episode_seeds),
+        "strategies": configs,
+    }
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Saved run manifest to {path}")
+
+
+def load_manifest(path, strategy=None):
+    """Load a manifest; warn if `strategy`'s current config differs from the recorded one."""
+    with open(path) as f:
+        manifest = json.load(f)
+    recorded = manifest["strategies"].get(strategy or config.NEGOTIATION_MODE)
+    if recorded is not None:
+        current = config_snapshot()
+        changed = sorted(k for k in set(recorded) | set(current)
+                         if recorded.get(k) != current.get(k))
+        if changed:
+            print(f"Warning: config differs from manifest {path}: {', '.join(changed)}")
+    return manifest
@@ -0,0 +1,351 @@
+# simulation.py
+import colorsys
+from config import *
+from maze import Maze
+from maze_file import CompiledMaze, compile_layout, load_maze
+from agent import Agent
+from agent_store import AgentStore, ArrayAgent
+from ghost import Ghost
+from conflict_manager import ConflictManager
+from seeding import EpisodeRNG, derive_episode_seeds, new_batch_seed
+
+
+def generated_color(index, saturation, value):
+    """Colour for the index-th agent/ghost; golden-ratio hue steps keep neighbours distinct."""
+    hue = (index * 0.618033988749895) % 1.0
+    r, g, b = colorsys.hsv_to_rgb(hue, saturation, value)
+    return int(r * 255), int(g * 255), int(b * 255)
+
+
+def entity_colors(listed, count, saturation, value):
+    return [listed[i] if i < len(listed) else generated_color(i, saturation, value)
+            for i in range(count)]
+
+
+def start_positions(rng, layout=None, listed_agents=None, listed_ghosts=None):
+    """Start cells for NUM_AGENTS agents and NUM_GHOSTS ghosts.
+
+    The listed starts (START_POSITIONS / GHOST_START_POSITIONS by default) are used
+    first; any remaining starts are sampled without repeats from the walkable cells
+    of `layout` (rows or a CompiledMaze, MAZE_LAYOUT by default).
+    """
+    if listed_agents is None:
+        listed_agents = START_POSITIONS
+    if listed_ghosts is None:
+        listed_ghosts = GHOST_START_POSITIONS
+    agent_starts = list(listed_agents[:NUM_AGENTS])
+    ghost_starts = list(listed_ghosts[:NUM_GHOSTS])
+    extra_agents = NUM_AGENTS - len(agent_starts)
+    extra_ghosts = NUM_GHOSTS - len(ghost_starts)
+    if extra_agents or extra_ghosts:
+        if layout is None:
+            layout = MAZE_LAYOUT
+        taken = set(agent_starts) | set(ghost_starts)
+        if isinstance(layout, CompiledMaze):
+            free = [cell for cell in layout.walkable_cells() if cell not in taken]
+        else:
+            free = [(r, c) for r, row in enumerate(layout) for c, cell in enumerate(row)
+                    if cell != "#" and (r, c) not in taken]
+        if extra_agents + extra_ghosts > len(free):
+            raise ValueError(f"maze has only {len(free)} free cells for "
+                             f"{extra_agents + extra_ghosts} sampled start positions")
+        sampled = rng.sample(free, extra_agents + extra_ghosts)
+        agent_starts += sampled[:extra_agents]
+        ghost_starts += sampled[extra_agents:]
+    return agent_starts, ghost_starts
+
+
+def new_game(screen, episode_id, log_list, rng, agent_starts, ghost_starts, layout,
+             exclusions):
+    """Fresh maze, agents, ghosts and manager (plus the AgentStore, or None)."""
+    maze = Maze(screen, rng.maze, agent_starts + ghost_starts, layout, exclusions)
+    agent_colors = entity_colors(AGENT_COLORS, NUM_AGENTS, 0.8, 1.0)
+    ghost_colors = entity_colors(GHOST_COLORS, NUM_GHOSTS, 0.4, 1.0)
+    if USE_AGENT_STORE:
+        store = AgentStore(len(agent_starts), maze)
+        agents_list = [
+            ArrayAgent(store, i, i + 1, agent_colors[i], row, col, maze, None, rng.agents)
+            for i, (row, col) in enumerate(agent_starts)
+        ]
+    else:
+        store = None
+        agents_list = [
+            Agent(i + 1, agent_colors[i], row, col, maze, None, rng.agents)
+            for i, (row, col) in enumerate(agent_starts)
+        ]
+    ghosts_list = [
+        Ghost(i + 1, ghost_colors[i], row, col, maze, rng.ghosts)
+        for i, (row, col) in enumerate(ghost_starts)
+    ]
+    manager = ConflictManager(maze, agents_list, ghosts_list, episode_id, log_list,
+                               rng.conflicts)
+    return maze, agents_list, ghosts_list, manager, store
+
+
+def reusable(game, agent_starts, ghost_starts):
+    """Whether reset_game can reset `game` in place for these start cells."""
+    if game is None:
+        return False
+    _, agents, ghosts, manager = game
+    return (len(agents) == len(agent_starts) and len(ghosts) == len(ghost_starts)
+            and (manager.agent_store is not None) == bool(USE_AGENT_STORE))
+
+
+def reset_game(screen, episode_id, log_list, seed, verbose=True, layout=None,
+               listed_agents=None, listed_ghosts=None, exclusions=None, game=None):
+    """Maze, agents, ghosts and manager for episode episode_id.
+
+    game is the (maze, agents, ghosts, manager) of an earlier episode on the same
+    layout: those objects are reset in place and returned when the agent and ghost
+    counts still fit, so only the pellets are placed anew.
+    """
+    rng = EpisodeRNG(seed)
+    agent_starts, ghost_starts = start_positions(rng.starts, layout, listed_agents,
+                                                 listed_ghosts)
+    if reusable(game, agent_starts, ghost_starts):
+        maze, agents_list, ghosts_list, manager = game
+        maze.reset(rng.maze, agent_starts + ghost_starts, exclusions)
+        store = manager.agent_store
+        if store is not None:
+            store.reset()
+        for agent, (row, col) in zip(agents_list, agent_starts):
+            agent.reset(row, col, rng.agents)
+        for ghost, (row, col) in zip(ghosts_list, ghost_starts):
+            ghost.reset(row, col, rng.ghosts)
+        manager.reset(episode_id, log_list, rng.conflicts)
+    else:
+        maze, agents_list, ghosts_list, manager, store = new_game(
+            screen, episode_id, log_list, rng, agent_starts, ghost_starts, layout,
+            exclusions)
+    manager.is_paused = True
+    manager.agent_store = store
+    manager.verbose = verbose
+    for a in agents_list:
+        a.manager = manager
+        if (a.row, a.col) in maze.shared_route_cells:
+            manager.lock(a, (a.row, a.col))
+    for g in ghosts_list:
+        g.manager = manager
+    if verbose:
+        print(f"--- EPISODE {episode_id} READY ---")
+    return maze, agents_list, ghosts_list, manager
+
+
+class Simulation:
+    """Headless episode engine: no display, font or event pump required."""
+
+    def __init__(self, log_list=None, summary_list=None, screen=None, verbose=False,
+                 skip_idle=True, profiler=None, layout=None, agent_starts=None,
+                 ghost_starts=None, exclusions=None):
+        self.log_list = log_list if log_list is not None else []
+        self.summary_list = summary_list if summary_list is not None else []
+        self.screen = screen
+        self.verbose = verbose
+        # Maze for every episode, with its start cells and pellet exclusions
+        # (maze_generator.GeneratedMaze has all four). layout is rows or a CompiledMaze;
+        # when None, MAZE_FILE if set, else MAZE_LAYOUT. A maze file brings its own starts.
+        if layout is None and MAZE_FILE:
+            layout = load_maze(MAZE_FILE)
+        if isinstance(layout, CompiledMaze):
+            if agent_starts is None:
+                agent_starts = layout.agent_starts
+            if ghost_starts is None:
+                ghost_starts = layout.ghost_starts
+        elif layout is None:
+            layout = MAZE_LAYOUT
+        if not isinstance(layout, CompiledMaze):
+            # Compiled once; every episode's Maze shares the walls and neighbour tables
+            layout = compile_layout(layout)
+        self.layout = layout
+        self.agent_starts = agent_starts
+        self.ghost_starts = ghost_starts
+        self.exclusions = exclusions
+        # run_episode jumps over ticks where every agent and ghost only counts down
+        self.skip_idle = skip_idle
+
+        self.batch_seed = None
+        self.episode_seeds = []
+
+        self.episode_id = 0
+        self.episode_seed = None
+        self.maze = None
+        self.agents = []
+        self.ghosts = []
+        self.manager = None
+        self.episode_done = False
+        self.last_summary = None
+
+        # profiler.TickProfiler or None; it wraps the phase methods, so nothing here
+        # checks for it per tick
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument(self)
+
+    def reset(self, episode_id, seed=None):
+        if seed is None:
+            seed = new_batch_seed()
+        self.episode_id = episode_id
+        self.episode_seed = seed
+        # The previous episode's objects are reset in place rather than rebuilt
+        game = None
+        if self.manager is not None:
+            game = (self.maze, self.agents, self.ghosts, self.manager)
+        self.maze, self.agents, self.ghosts, self.manager = reset_game(
+            self.screen, episode_id, self.log_list, seed, self.verbose, self.layout,
+            self.agent_starts, self.ghost_starts, self.exclusions, game
+        )
+        self.episode_done = False
+        if self.profiler is not None:
+            self.profiler.instrument_episode(self)
+        return self.manager
+
+    def step(self):
+        """Advance the current episode by one tick. Returns True once it is over."""
+        manager = self.manager
+        manager.time_step += 1
+
+        # Negotiation rounds first
+        manager.process_negotiations()
+
+        self.move_ghosts()
+        self.decide_agents()
+        manager.resolve_path_conflicts(self.agents)
+        manager.check_ghost_collisions(self.agents)
+
+        if self.is_game_over():
+            self.finish_episode()
+        return self.episode_done
+
+    def move_ghosts(self):
+        manager = self.manager
+        for ghost in self.ghosts:
+            ghost.decide_next_move(self.agents)
+        manager.update_ghost_positions()
+
+    def decide_agents(self):
+        manager = self.manager
+        manager.index_intents()
+        if manager.agent_store is not None:
+            manager.agent_store.decide_all(self.agents)
+        else:
+            for agent in self.agents:
+                agent.decide_next_move()
+
+    def ticks_until_next_event(self):
+        """Ticks until some agent, ghost or negotiation has real work (1 = the next tick)."""
+        if self.manager.negotiations:
+            return 1
+        ghost_cells = {(g.row, g.col) for g in self.ghosts if g.is_active}
+        ticks = min(ghost.ticks_until_action() for ghost in self.ghosts) if self.ghosts else None
+        store = self.manager.agent_store
+        if store is not None:
+            if store.any_active_at(ghost_cells):
+                return 1
+            agent_ticks = store.ticks_until_action()
+            if agent_ticks is not None and (ticks is None or agent_ticks < ticks):
+                ticks = agent_ticks
+            return 1 if ticks is None else ticks
+        for agent in self.agents:
+            if agent.is_active and (agent.row, agent.col) in ghost_cells:
+                return 1
+            agent_ticks = agent.ticks_until_action()
+            if agent_ticks is not None and (ticks is None or agent_ticks < ticks):
+                ticks = agent_ticks
+        return 1 if ticks is None else ticks
+
+    def skip_idle_ticks(self, max_steps=None):
+        """Fast-forward over the idle ticks before the next event.
+
+        Idle ticks only decrement wait counters and movement timers, never touch the RNG and
+        never move anyone, so the next step() logs the same time_step and outcome as
+        tick-by-tick execution.
+        """
+        idle = self.ticks_until_next_event() - 1
+        if max_steps is not None:
+            idle = min(idle, max_steps - self.manager.time_step - 1)
+        if idle <= 0:
+            return 0
+        for ghost in self.ghosts:
+            ghost.skip_idle_ticks(idle)
+        if self.manager.agent_store is not None:
+            self.manager.agent_store.skip_idle_ticks(idle)
+        else:
+            for agent in self.agents:
+                agent.skip_idle_ticks(idle)
+        self.manager.time_step += idle
+        return idle
+
+    def is_game_over(self):
+        active_agents = [a for a in self.agents if a.is_active]
+        if len(active_agents) == 1:
+            survivor = active_agents[0]
+            dead_count = len(self.agents) - 1
+            threshold = dead_count * SCORE_PER_DEAD_AGENT_THRESHOLD
+            if survivor.score >= threshold:
+                return True
+        if not self.maze.pellets:
+            return True
+        if not active_agents:
+            return True
+        return False
+
+    def finish_episode(self):
+        # summary_list may be a write-only CsvLogSink, so keep the last summary here too
+        self.last_summary = self.episode_summary()
+        self.summary_list.append(self.last_summary)
+        self.episode_done = True
+
+    def episode_summary(self):
+        manager = self.manager
+        if manager.total_conflicts_with_wait > 0:
+            avg_loser_wait = (
+                manager.total_loser_wait_time /
+                manager.total_conflicts_with_wait
+            )
+        else:
+            avg_loser_wait = 0.0
+
+        return {
+            "episode": self.episode_id,
+            "post_move_conflicts": manager.conflict_count,
+            "pre_move_conflicts": manager.total_conflicts_with_wait,
+            "negotiations": manager.negotiation_success,
+            "predicted_conflicts": manager.predicted_conflict_events,
+            "lock_conflicts": manager.lock_conflict_events,
+            "avg_loser_wait": avg_loser_wait,
+            # One agent<id>_score column per agent; save_logs_to_csv picks them all up
+            **{f"agent{agent.agent_id}_score": agent.score for agent in self.agents}
+        }
+
+    def run_episode(self, episode_id, seed=None, max_steps=MAX_EPISODE_STEPS):
+        """Play one episode to completion (or max_steps ticks) and return its summary."""
+        self.reset(episode_id, seed)
+        self.manager.is_paused = False
+        while True:
+            if self.skip_idle:
+                self.skip_idle_ticks(max_steps)
+            if self.step():
+                break
+            if max_steps is not None and self.manager.time_step >= max_steps:
+                self.finish_episode()
+                break
+        if self.verbose:
+            print(f"Episode {episode_id} finished.")
+        return self.last_summary
+
+    def run_batch(self, episodes=MAX_EPISODES, seeds=None, first_episode=1,
+                  max_steps=MAX_EPISODE_STEPS, batch_seed=None):
+        """Run consecutive episodes.
+
+        Episode first_episode + i is seeded with seeds[i] if given, otherwise with a seed
+        derived from batch_seed (a fresh random batch seed when that is None too).
+        """
+        if seeds is None:
+            if batch_seed is None:
+                batch_seed = new_batch_seed()
+            seeds = derive_episode_seeds(batch_seed, episodes, first_episode)
+        self.batch_seed = batch_seed
+        self.episode_seeds = list(seeds)
+        for i, seed in enumerate(seeds):
+            self.run_episode(first_episode + i, seed, max_steps)
+        return self.summary_list
@@ -0,0 +1,230 @@
+# agent_store.py
+"""Optional struct-of-arrays agent state (USE_AGENT_STORE, needs NumPy).
+
+Per-agent counters live in NumPy columns and ArrayAgent is a thin view over one row,
+so the countdown-only part of decide_next_move, the idle-tick skip and the energy
+bookkeeping of committed moves run as whole-array operations.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; reset_game falls back to plain Agents
+    np = None
+
+from config import *
+from agent import Agent
+
+# Column name -> dtype. Everything else on an agent (path, colour, ids, ...) stays a
+# normal attribute.
+COLUMNS = {
+    "row": "int64",
+    "col": "int64",
+    "next_row": "int64",
+    "next_col": "int64",
+    "energy": "float64",
+    "score": "int64",
+    "move_timer": "int64",
+    "wait_turns_remaining": "int64",
+    "waiting_ticks": "int64",
+    "total_move_attempts": "int64",
+    "is_active": "bool",
+    "in_conflict": "bool",
+    "attempted_move": "bool",
+    "state": "int8",
+}
+
+
+class AgentStore:
+    def __init__(self, size, maze):
+        if np is None:
+            raise ImportError("USE_AGENT_STORE needs NumPy")
+        self.size = size
+        self.maze = maze
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.zeros(size, dtype=dtype))
+        self.state_names = []
+        self.state_codes = {}
+        for name in ("ACTIVE", "WAIT", "DROPPED_OUT", "NEGOTIATING", "WANDERING", "IDLE"):
+            self.state_code(name)
+        # Zero-copy view of the maze's pellet bytes, indexed by row * cols + col
+        self.pellet_grid = np.frombuffer(maze.pellet_grid, dtype=np.uint8)
+
+        # Deferred-turn bookkeeping for decide_all()
+        self.deferring = False
+        self.acting = -1
+        self.pending = np.zeros(size, dtype=bool)
+        self.touched = np.zeros(size, dtype=bool)
+        self.agents = [None] * size
+        self.agent_ids = np.zeros(size, dtype=np.int64)
+
+    def reset(self):
+        """Zero every column for a new episode; ArrayAgent.reset() then fills its row."""
+        for name in COLUMNS:
+            getattr(self, name)[:] = 0
+        self.deferring = False
+        self.acting = -1
+        self.pending[:] = False
+        self.touched[:] = False
+
+    def state_code(self, name):
+        code = self.state_codes.get(name)
+        if code is None:
+            code = len(self.state_names)
+            self.state_names.append(name)
+            self.state_codes[name] = code
+        return code
+
+    def on_pellet(self):
+        return self.pellet_grid[self.row * self.maze.cols + self.col] == 1
+
+    # --- decide phase ---
+
+    def decide_all(self, agents):
+        """Same outcome as calling decide_next_move() on every agent in order.
+
+        Agents whose turn would only count down (in a negotiation, waiting, dropped out,
+        or between moves) are classified up front and handled with array operations;
+        the rest run decide_next_move() in order. If a deciding agent writes to a
+        deferred one (a negotiation or priority loss), the deferred agent takes its
+        turn as a normal call: before the write when it comes earlier in the order,
+        after the pass otherwise, exactly as a sequential loop would see it.
+        """
+        conflict = self.in_conflict.copy()
+        waiting = ~conflict & (self.wait_turns_remaining > 0)
+        rest = ~conflict & ~waiting
+        dropped = rest & ~self.is_active
+        counting = (rest & self.is_active & ~self.on_pellet()
+                    & (self.move_timer + 1 < AGENT_SPEED))
+        self.pending = conflict | waiting | dropped | counting
+        self.touched[:] = False
+
+        self.deferring = True
+        try:
+            for i in np.flatnonzero(~self.pending).tolist():
+                self.acting = i
+                agents[i].decide_next_move()
+        finally:
+            self.deferring = False
+            self.acting = -1
+
+        for i in np.flatnonzero(self.pending & self.touched).tolist():
+            self.pending[i] = False
+            agents[i].decide_next_move()
+
+        idle = self.pending
+        self.state[conflict & idle] = self.state_codes["NEGOTIATING"]
+        wait_idle = waiting & idle
+        self.state[wait_idle] = self.state_codes["WAIT"]
+        self.wait_turns_remaining[wait_idle] -= 1
+        self.waiting_ticks[wait_idle] += 1
+        self.state[dropped & idle] = self.state_codes["DROPPED_OUT"]
+        self.move_timer[counting & idle] += 1
+        self.next_row[idle] = self.row[idle]
+        self.next_col[idle] = self.col[idle]
+        self.attempted_move[idle] = False
+        self.pending[:] = False
+
+    def before_write(self, index):
+        """Called by ArrayAgent before a column write while decide_all() is running."""
+        if not self.pending[index]:
+            return
+        if index < self.acting:
+            # Its turn came first in sequential order: take it now, then accept the write
+            self.pending[index] = False
+            self.agents[index].decide_next_move()
+        else:
+            self.touched[index] = True
+
+    # --- idle-tick skipping ---
+
+    def any_active_at(self, cells):
+        if not cells:
+            return False
+        cols = self.maze.cols
+        flat = self.row * cols + self.col
+        targets = np.fromiter((r * cols + c for r, c in cells), dtype=np.int64, count=len(cells))
+        return bool(np.isin(flat[self.is_active], targets).any())
+
+    def ticks_until_action(self):
+        """Vectorised Agent.ticks_until_action(): min over agents, None if nobody acts."""
+        ticks = np.where(self.on_pellet(), self.wait_turns_remaining + 1,
+                         self.wait_turns_remaining + np.maximum(1, AGENT_SPEED - self.move_timer))
+        ticks = np.where(self.in_conflict, 1, ticks)
+        acting = self.in_conflict | self.is_active
+        if not acting.any():
+            return None
+        return int(ticks[acting].min())
+
+    def skip_idle_ticks(self, ticks):
+        """Vectorised Agent.skip_idle_ticks(ticks) for every agent."""
+        waited = np.minimum(self.wait_turns_remaining, ticks)
+        self.state[waited > 0] = self.state_codes["WAIT"]
+        self.wait_turns_remaining -= waited
+        self.waiting_ticks += waited
+        left = ticks - waited
+        self.state[(left > 0) & ~self.is_active] = self.state_codes["DROPPED_OUT"]
+        counting = (left > 0) & self.is_active
+        self.move_timer[counting] += left[counting]
+        self.next_row[:] = self.row
+        self.next_col[:] = self.col
+        self.attempted_move[:] = False
+
+    # --- commit phase ---
+
+    def commit_moves(self, index, cells):
+        """Agent.commit_final_position(row, col, moved=True) for the active agents at `index`."""
+        rows, cols = np.divmod(cells, self.maze.cols)
+        old_cells = list(zip(self.row[index].tolist(), self.col[index].tolist()))
+        self.row[index] = rows
+        self.col[index] = cols
+        for i, cell, old_cell in zip(index.tolist(), zip(rows.tolist(), cols.tolist()), old_cells):
+            agent = self.agents[i]
+            agent.manager.move_agent(agent, old_cell)
+            if agent.path and cell == agent.path[0]:
+                agent.path.popleft()
+            agent.consecutive_blocks = 0
+        energy = self.energy[index] - ENERGY_LOSS_PER_MOVE
+        spent = energy <= 0
+        energy[spent] = 0
+        self.energy[index] = energy
+        self.is_active[index[spent]] = False
+
+
+def _column(name):
+    def get(self):
+        return getattr(self.store, name).item(self.index)
+
+    def set(self, value):
+        store = self.store
+        if store.deferring:
+            store.before_write(self.index)
+        getattr(store, name)[self.index] = value
+
+    return property(get, set)
+
+
+def _state_column():
+    def get(self):
+        return self.store.state_names[self.store.state.item(self.index)]
+
+    def set(self, value):
+        store = self.store
+        if store.deferring:
+            store.before_write(self.index)
+        store.state[self.index] = store.state_code(value)
+
+    return property(get, set)
+
+
+class ArrayAgent(Agent):
+    """Agent whose per-tick counters live in row `index` of an AgentStore."""
+
+    def __init__(self, store, index, *args, **kwargs):
+        self.store = store
+        self.index = index
+        super().__init__(*args, **kwargs)
+        store.agents[index] = self
+        store.agent_ids[index] = self.agent_id
+
+
+for _name in COLUMNS:
+    setattr(ArrayAgent, _name, _state_column() if _name == "state" else _column(_name))
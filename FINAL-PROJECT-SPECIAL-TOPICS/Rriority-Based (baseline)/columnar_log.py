@@ -0,0 +1,203 @@
+# columnar_log.py
+"""Columnar binary conflict log (CONFLICT_LOG_FORMAT = "columnar", needs NumPy).
+
+A log is a directory holding one raw little-endian file per column plus
+schema.json. The string columns (strategy, conflict_type, final_outcome) are
+stored as one-byte codes into per-column dictionaries kept in the schema, so a
+row costs 35 bytes instead of an 11-key dict or a CSV line.
+
+ColumnarLogSink appends each batch to the column files and rewrites the schema
+after every flush. load_columns() trusts the schema's row count, so a log cut
+short by a crash still loads the rows flushed so far. It memory-maps the columns
+without parsing anything, and export_csv() writes the same CSV as the CSV sink.
+
+    python columnar_log.py alternating_offers_conflicts_log.columns out.csv
+"""
+import argparse
+import csv
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only the columnar format needs it
+    np = None
+
+from config import *
+from log_sink import LogSink
+
+SCHEMA_FILE = "schema.json"
+FORMAT_VERSION = 1
+CATEGORY = "category"
+CODE_DTYPE = "<u1"
+
+# Column name -> dtype, or CATEGORY for dictionary-encoded strings. Same order as
+# the CSV columns.
+CONFLICT_LOG_COLUMNS = {
+    "episode": "<i4",
+    "time_step": "<i4",
+    "strategy": CATEGORY,
+    "conflict_type": CATEGORY,
+    "winner_id": "<i4",
+    "loser_id": "<i4",
+    "loser_wait_turns": "<i4",
+    "negotiation_rounds": "<i4",
+    "final_outcome": CATEGORY,
+    "corridor_row": "<i4",
+    "corridor_col": "<i4",
+}
+
+
+def column_file(path, name):
+    return os.path.join(path, name + ".bin")
+
+
+class ColumnarLogSink(LogSink):
+    """LogSink writing CONFLICT_LOG_COLUMNS into the log directory `path`."""
+
+    def __init__(self, path, columns=CONFLICT_LOG_COLUMNS, **kwargs):
+        if np is None:
+            raise ImportError('CONFLICT_LOG_FORMAT = "columnar" needs NumPy')
+        self.columns = dict(columns)
+        self.categories = {name: {} for name, dtype in self.columns.items()
+                           if dtype == CATEGORY}
+        self.written = 0           # rows on disk, recorded in the schema at each flush
+        self._files = None         # created with the first row, like the CSV sink
+        super().__init__(path, **kwargs)
+
+    def _encode(self, name, values):
+        codes = self.categories[name]
+        for value in values:
+            if value not in codes:
+                if len(codes) > np.iinfo(CODE_DTYPE).max:
+                    raise ValueError(f"too many distinct values in column {name!r}")
+                codes[value] = len(codes)
+        return np.fromiter((codes[value] for value in values), dtype=CODE_DTYPE,
+                           count=len(values))
+
+    def _write_rows(self, batch):
+        if self._files is None:
+            os.makedirs(self.filename, exist_ok=True)
+            self._files = {name: open(column_file(self.filename, name), "wb")
+                           for name in self.columns}
+            self._write_schema()
+        for name, dtype in self.columns.items():
+            values = [row[name] for row in batch]
+            if dtype == CATEGORY:
+                data = self._encode(name, values)
+            else:
+                data = np.array(values, dtype=dtype)
+            self._files[name].write(data.tobytes())
+        self.written += len(batch)
+
+    def _write_schema(self):
+        schema = {
+            "version": FORMAT_VERSION,
+            "rows": self.written,
+            "columns": [
+                {"name": name, "dtype": CODE_DTYPE, "categories": list(self.categories[name])}
+                if dtype == CATEGORY else {"name": name, "dtype": dtype}
+                for name, dtype in self.columns.items()
+            ],
+        }
+        tmp = os.path.join(self.filename, SCHEMA_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(schema, f, indent=1)
+        os.replace(tmp, os.path.join(self.filename, SCHEMA_FILE))
+
+    def _flush_rows(self):
+        if self._files is None:
+            return
+        # Column data first, then the row count that makes it visible to loaders
+        for f in self._files.values():
+            f.flush()
+        self._write_schema()
+
+    def _close_rows(self):
+        if self._files is not None:
+            for f in self._files.values():
+                f.close()
+
+
+class ColumnarLog:
+    """Read-only, memory-mapped view of a log written by ColumnarLogSink.
+
+    log[name] is a NumPy array (the codes for a categorical column); log.where()
+    builds row masks without decoding, e.g.
+    (log.where("final_outcome", "fallback") & (log["episode"] > 10)).sum().
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise ImportError("loading a columnar log needs NumPy")
+        with open(os.path.join(path, SCHEMA_FILE)) as f:
+            schema = json.load(f)
+        if schema["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported columnar log version {schema['version']}")
+        self.path = path
+        self.rows = schema["rows"]
+        self.names = [column["name"] for column in schema["columns"]]
+        self.categories = {column["name"]: column["categories"]
+                           for column in schema["columns"] if "categories" in column}
+        self.columns = {}
+        for column in schema["columns"]:
+            dtype = np.dtype(column["dtype"])
+            if self.rows:
+                self.columns[column["name"]] = np.memmap(
+                    column_file(path, column["name"]), dtype=dtype, mode="r", shape=(self.rows,))
+            else:
+                self.columns[column["name"]] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def code(self, name, value):
+        """Code of `value` in categorical column `name`, -1 if it never occurs."""
+        categories = self.categories[name]
+        return categories.index(value) if value in categories else -1
+
+    def where(self, name, value):
+        """Boolean row mask for column `name` == value."""
+        if name in self.categories:
+            return self.columns[name] == self.code(name, value)
+        return self.columns[name] == value
+
+    def decoded(self, name, start=0, stop=None):
+        """Plain Python values of rows start:stop of column `name`."""
+        values = self.columns[name][start:stop].tolist()
+        if name in self.categories:
+            categories = self.categories[name]
+            return [categories[code] for code in values]
+        return values
+
+    def iter_rows(self, chunk_rows=65536):
+        """Yield rows as value lists in column order, decoding chunk_rows at a time."""
+        for start in range(0, self.rows, chunk_rows):
+            stop = min(start + chunk_rows, self.rows)
+            yield from zip(*(self.decoded(name, start, stop) for name in self.names))
+
+
+def load_columns(path):
+    return ColumnarLog(path)
+
+
+def export_csv(path, filename):
+    """Write the columnar log at `path` as the CSV the CSV sink would have written."""
+    log = load_columns(path)
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(log.names)
+        writer.writerows(log.iter_rows())
+    print(f"Exported {len(log)} conflict records to {filename}")
+    return len(log)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a columnar conflict log to CSV.")
+    parser.add_argument("path", help="log directory written with CONFLICT_LOG_FORMAT = \"columnar\"")
+    parser.add_argument("csv_file", nargs="?", help="default: the directory name with .csv")
+    args = parser.parse_args()
+    export_csv(args.path, args.csv_file or os.path.splitext(args.path.rstrip("/\\"))[0] + ".csv")
@@ -1,94 +1,133 @@
-
-CELL_SIZE = 30
-PELLET_POINT = 1
-SHARED_ROUTE_PENALTY = 8
-AGENT_SPEED = 10
-MAX_ENERGY = 80
-
-# Lower number = Faster speed (frames per move)
-GHOST_SPEED = 10
-
-# Probability that the "Lottery" fails and resorts to punishing everyone
-LOTTERY_FAIL_CHANCE = 0.8
-
-# Energy loss for movement
-ENERGY_LOSS_PER_MOVE = 0.5
-
-# Ghost collision penalty
-GHOST_CATCH_PENALTY = 10
-GHOST_AVOIDANCE_RADIUS = 2 
-
-# Pellet Configuration
-PELLET_SPAWN_RATIO = 0.3
-
-# --- SURVIVAL CONSTANT ---
-SCORE_PER_DEAD_AGENT_THRESHOLD = 1
-
-#FONT CONSTANT
-FONT_SIZE = 18
-
-# SENSING / ANTICIPATION CONSTANTS
-SENSING_RADIUS = 4       
-LOOKAHEAD_STEPS = 2      
-
-#STRATEGY PARAMETERS
-NEGOTIATION_MODE = "priority_baseline"
-PRIORITY_RULE = "highest_score"  
-BASELINE_WAIT_TURNS = 2          
-BASELINE_LOSER_PENALTY = 5       
-
-#BATCH RUN CONFIG
-MAX_EPISODES = 20
-
-# Colors
-BLACK = (0, 0, 0)
-WALL_COLOR = (40, 40, 50)
-CORRIDOR_FLOOR_COLOR = (60, 60, 80)
-TEXT_COLOR = (255, 255, 255)
-HIGHLIGHT_COLOR = (255, 255, 0)
-
-# Energy Bar Colors
-BAR_WIDTH = 250
-BAR_HEIGHT = 10
-BAR_BG_COLOR = (30, 30, 30)
-BAR_GOOD_COLOR = (0, 180, 0)
-BAR_WARN_COLOR = (255, 165, 0)
-BAR_DANGER_COLOR = (255, 0, 0)
-
-# --- Agent Colors ---
-AGENT_COLORS = [(255, 50, 50), (50, 255, 50), (50, 100, 255)]
-GHOST_COLORS = [(255, 150, 150), (150, 255, 150), (150, 150, 255)]
-
-# --- MAZE LAYOUT ---
-MAZE_LAYOUT = [
-    "###############################",
-    "#.............................#",
-    "###########.###.###############",
-    "#.#........##.#.#.......#.#...#",
-    "#.#.#.#####.#.....###.#.#.###.#",
-    "#.#.#.......#.#.##....#.#.....#",
-    "#.###.#######.#.#####.###.#####",
-    "#...........#.#.#.........#...#",
-    "#######.###.#.#.###.#######.#.#",
-    "#......#....#.#.#...........#.#",
-    "#.#####.###...#.###########.#.#",
-    "#...........#.#.#.........#...#",
-    "#.###########.#.#.###########C#",
-    "#.#.#.........C.C.....#.#.....#",
-    "#.#.#.#########.###.#.#.#.###.#",
-    "#.....#.....#.#.#...#.....#...#",
-    "#.#########.#.#.#.#############",
-    "#.............#.#.............#",
-    "#C###############.#############",
-    "#.............................#",
-    "###############################"
-]
-
-START_POSITIONS = [(1, 1), (1, 29), (17, 15)]
-GHOST_START_POSITIONS = [(9, 1), (9, 29)]
-#Red Line Exclusion Area
-RED_LINE_EXCLUSION = set([
-    (r, 15) for r in range(1, 18)
-]).union(set([
-    (1, c) for c in range(1, 30)
+
+CELL_SIZE = 30
+PELLET_POINT = 1
+SHARED_ROUTE_PENALTY = 8
+AGENT_SPEED = 10
+MAX_ENERGY = 80
+
+# Lower number = Faster speed (frames per move)
+GHOST_SPEED = 10
+
+# Probability that the "Lottery" fails and resorts to punishing everyone
+LOTTERY_FAIL_CHANCE = 0.8
+
+# Energy loss for movement
+ENERGY_LOSS_PER_MOVE = 0.5
+
+# Ghost collision penalty
+GHOST_CATCH_PENALTY = 10
+GHOST_AVOIDANCE_RADIUS = 2 
+
+# Pellet Configuration
+PELLET_SPAWN_RATIO = 0.3
+
+# --- SURVIVAL CONSTANT ---
+SCORE_PER_DEAD_AGENT_THRESHOLD = 1
+
+#FONT CONSTANT
+FONT_SIZE = 18
+TEXT_CACHE_SIZE = 256             # rendered scoreboard strings kept (LRU)
+
+# SENSING / ANTICIPATION CONSTANTS
+SENSING_RADIUS = 4       
+LOOKAHEAD_STEPS = 2      
+
+# PATH PLANNING
+# Follow the maze's shared pellet distance field; the per-agent BFS is only
+# used when that route passes a ghost or no pellet is reachable.
+USE_PELLET_DISTANCE_FIELD = True
+
+# SIMULATION CLOCK TIMING (ticks of manager.time_step, not wall time)
+PATH_TTL_TICKS = 42      # was 700 ms at 60 FPS
+PULSE_PERIOD_TICKS = 30
+
+#STRATEGY PARAMETERS
+NEGOTIATION_MODE = "priority_baseline"
+PRIORITY_RULE = "highest_score"  
+BASELINE_WAIT_TURNS = 2          
+BASELINE_LOSER_PENALTY = 5       
+
+#BATCH RUN CONFIG
+MAX_EPISODES = 20
+# Headless safety cap on ticks per episode
+MAX_EPISODE_STEPS = 20000
+#GUI PACING: ticks per second at 1x, display refresh cap, share of each frame
+#that may be spent simulating; keys 1 / 2 / 3 pick a multiplier, T toggles turbo
+SIM_TICKS_PER_SECOND = 60
+RENDER_FPS = 60
+SPEED_MULTIPLIERS = (1, 8, 64)
+SIM_FRAME_BUDGET = 0.8
+#LOG STREAMING: rows go to the CSVs from a background writer thread as they happen
+#(batched writes, periodic flushes, bounded queue) instead of piling up until S
+STREAM_LOGS = True
+LOG_BATCH_ROWS = 512
+LOG_FLUSH_SECONDS = 1.0
+LOG_MAX_PENDING = 10000
+#"csv" OR "columnar": STREAMED CONFLICT LOG AS TYPED COLUMN FILES (columnar_log.py, NEEDS NUMPY)
+CONFLICT_LOG_FORMAT = "csv"
+
+# Colors
+BLACK = (0, 0, 0)
+WALL_COLOR = (40, 40, 50)
+CORRIDOR_FLOOR_COLOR = (60, 60, 80)
+TEXT_COLOR = (255, 255, 255)
+HIGHLIGHT_COLOR = (255, 255, 0)
+
+# Energy Bar Colors
+BAR_WIDTH = 250
+BAR_HEIGHT = 10
+BAR_BG_COLOR = (30, 30, 30)
+BAR_GOOD_COLOR = (0, 180, 0)
+BAR_WARN_COLOR = (255, 165, 0)
+BAR_DANGER_COLOR = (255, 0, 0)
+
+# --- Agent Colors ---
+AGENT_COLORS = [(255, 50, 50), (50, 255, 50), (50, 100, 255)]
+GHOST_COLORS = [(255, 150, 150), (150, 255, 150), (150, 150, 255)]
+
+# --- MAZE LAYOUT ---
+MAZE_LAYOUT = [
+    "###############################",
+    "#.............................#",
+    "###########.###.###############",
+    "#.#........##.#.#.......#.#...#",
+    "#.#.#.#####.#.....###.#.#.###.#",
+    "#.#.#.......#.#.##....#.#.....#",
+    "#.###.#######.#.#####.###.#####",
+    "#...........#.#.#.........#...#",
+    "#######.###.#.#.###.#######.#.#",
+    "#......#....#.#.#...........#.#",
+    "#.#####.###...#.###########.#.#",
+    "#...........#.#.#.........#...#",
+    "#.###########.#.#.###########C#",
+    "#.#.#.........C.C.....#.#.....#",
+    "#.#.#.#########.###.#.#.#.###.#",
+    "#.....#.....#.#.#...#.....#...#",
+    "#.#########.#.#.#.#############",
+    "#.............#.#.............#",
+    "#C###############.#############",
+    "#.............................#",
+    "###############################"
+]
+
+START_POSITIONS = [(1, 1), (1, 29), (17, 15)]
+GHOST_START_POSITIONS = [(9, 1), (9, 29)]
+#MAZE FILE: load the maze from this file (maze_file.py) instead of MAZE_LAYOUT,
+#compiled tables cached in MAZE_CACHE_DIR next to it (window sized for MAZE_LAYOUT: bigger
+#mazes are for headless runs)
+MAZE_FILE = None
+MAZE_CACHE_DIR = ".maze_cache"
+#Scenario size: agents/ghosts beyond the lists above start on sampled walkable cells
+#and get generated colours once AGENT_COLORS / GHOST_COLORS run out
+NUM_AGENTS = 3
+NUM_GHOSTS = 2
+
+# AGENT STORAGE: NumPy struct-of-arrays agent counters (agent_store.py),
+# same results, pays off with many agents
+USE_AGENT_STORE = False
+#Red Line Exclusion Area
+RED_LINE_EXCLUSION = set([
+    (r, 15) for r in range(1, 18)
+]).union(set([
+    (1, c) for c in range(1, 30)
 ]))
\ No newline at end of file
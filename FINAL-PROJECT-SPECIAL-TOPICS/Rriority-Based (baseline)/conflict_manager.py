@@ -1,225 +1,472 @@
-# conflict_manager.py
-import random
-from config import *
-
-class ConflictManager:
-    def __init__(self, maze, agents, ghosts, episode_id, log_list):
-        self.maze = maze
-        self.conflict_count = 0              # post-move conflicts
-        self.negotiation_success = 0         # pre-move priority resolutions only
-        self.agents = {agent.agent_id: agent for agent in agents}
-        self.ghosts = ghosts
-        self.is_paused = False
-        self.ghost_positions_cache = []
-        self.game_result = None
-
-        self.shared_route_locks = {cell: None for cell in self.maze.shared_route_cells}
-        self.shared_route_last_unlock = {cell: None for cell in self.maze.shared_route_cells}
-        self.lock_conflict_events = 0
-
-        self.time_step = 0
-        self.episode_id = episode_id
-        self.log_list = log_list
-
-        self.predicted_conflict_events = 0   # number of pre-move predicted conflicts
-
-        # For average loser waiting time (per episode)
-        self.total_loser_wait_time = 0.0
-        self.total_conflicts_with_wait = 0
-
-    def update_ghost_positions(self):
-        self.ghost_positions_cache = [(g.row, g.col) for g in self.ghosts if g.is_active]
-
-    def is_shared_route(self, cell):
-        return cell in self.maze.shared_route_cells
-
-    def lock(self, agent, cell):
-        if not self.is_shared_route(cell):
-            return True
-        holder = self.shared_route_locks.get(cell)
-        if holder is None or holder == agent.agent_id:
-            self.shared_route_locks[cell] = agent.agent_id
-            return True
-        self.lock_conflict_events += 1
-        return False
-
-    def unlock(self, agent, cell):
-        if not self.is_shared_route(cell):
-            return
-        holder = self.shared_route_locks.get(cell)
-        if holder == agent.agent_id:
-            self.shared_route_locks[cell] = None
-            self.shared_route_last_unlock[cell] = agent.agent_id
-
-    # --- Strategy 1: Priority-based pre-move conflicts ---
-
-    def priority_metric(self, agent):
-        if PRIORITY_RULE == "highest_score":
-            return agent.score
-        elif PRIORITY_RULE == "lowest_energy":
-            return -agent.energy
-        return agent.score
-
-    def handle_priority_conflict(self, agent_a, agent_b, corridor_cell):
-        # Called when a pre-move corridor conflict is predicted
-        self.predicted_conflict_events += 1
-
-        m_a = self.priority_metric(agent_a)
-        m_b = self.priority_metric(agent_b)
-
-        if m_a > m_b:
-            winner, loser = agent_a, agent_b
-        elif m_b > m_a:
-            winner, loser = agent_b, agent_a
-        else:
-            winner, loser = random.sample([agent_a, agent_b], 2)
-
-        loser.wait_turns_remaining = max(loser.wait_turns_remaining, BASELINE_WAIT_TURNS)
-        loser.score = max(0, loser.score - BASELINE_LOSER_PENALTY)
-
-        # Update episode-level wait-time stats
-        self.total_loser_wait_time += BASELINE_WAIT_TURNS
-        self.total_conflicts_with_wait += 1
-
-        # Count as a successful negotiation (pre-move)
-        self.negotiation_success += 1
-
-        # Log this pre-move conflict (one row per event)
-        log_entry = {
-            "episode": self.episode_id,
-            "time_step": self.time_step,
-            "strategy": NEGOTIATION_MODE,
-            "conflict_type": "pre_move",
-            "winner_id": winner.agent_id,
-            "loser_id": loser.agent_id,
-            "loser_wait_turns": BASELINE_WAIT_TURNS,
-            "negotiation_rounds": 1,
-            "final_outcome": "success",
-            "corridor_row": corridor_cell[0],
-            "corridor_col": corridor_cell[1]
-        }
-        self.log_list.append(log_entry)
-        return winner
-
-    def _apply_fallback_rule(self, agent):
-        if not agent.is_active:
-            return
-        agent.score = max(0, agent.score - 3)
-        agent.energy -= SHARED_ROUTE_PENALTY // 2
-        if agent.energy <= 0:
-            agent.energy = 0
-            agent.is_active = False
-
-    def resolve_path_conflicts(self, agents):
-        target_map = {}
-        for agent in agents:
-            if not agent.is_active:
-                continue
-            tr, tc = agent.next_row, agent.next_col
-            if (tr, tc) != (agent.row, agent.col):
-                target_map.setdefault((tr, tc), []).append(agent)
-
-        final_positions = {agent.agent_id: (agent.row, agent.col) for agent in agents}
-        moved_flags = {agent.agent_id: False for agent in agents}
-
-        for cell, contenders in target_map.items():
-            ghost_occupied = cell in self.ghost_positions_cache
-
-            if self.is_shared_route(cell):
-                current_holder = self.shared_route_locks.get(cell)
-                if current_holder is not None and all(a.agent_id != current_holder for a in contenders):
-                    for a in contenders:
-                        self.lock_conflict_events += 1
-                    continue
-
-            if len(contenders) == 1 and not ghost_occupied:
-                a = contenders[0]
-                if self.is_shared_route(cell):
-                    if not self.lock(a, cell):
-                        continue
-                final_positions[a.agent_id] = cell
-                moved_flags[a.agent_id] = True
-                continue
-
-            # --- POST-MOVE CONFLICT ---
-            self.conflict_count += 1
-
-            if ghost_occupied:
-                continue
-
-            def priority(a):
-                return a.score - (a.energy / MAX_ENERGY) * 0.5
-
-            contenders_sorted = sorted(contenders, key=lambda a: priority(a))
-            winner = contenders_sorted[0]
-
-            if len(contenders_sorted) > 1 and abs(priority(contenders_sorted[0]) - priority(contenders_sorted[1])) < 0.15:
-                if random.random() < 0.25:
-                    winner = contenders_sorted[1]
-
-            if self.is_shared_route(cell):
-                if not self.lock(winner, cell):
-                    continue
-
-            # Note: post-move resolutions are NOT counted as "negotiation_success"
-            final_positions[winner.agent_id] = cell
-            moved_flags[winner.agent_id] = True
-            winner.conflict_wins += 1
-
-            equal_priorities = all(abs(priority(a) - priority(contenders_sorted[0])) < 1e-6 for a in contenders)
-            if equal_priorities:
-                if random.random() > LOTTERY_FAIL_CHANCE:
-                    chosen = random.choice(contenders)
-                    final_positions[chosen.agent_id] = cell
-                    moved_flags[chosen.agent_id] = True
-                    chosen.conflict_wins += 1
-                else:
-                    for a in contenders:
-                        self._apply_fallback_rule(a)
-
-        for agent in agents:
-            if not agent.is_active:
-                continue
-
-            old_row, old_col = agent.row, agent.col
-            fr, fc = final_positions[agent.agent_id]
-            moved = moved_flags[agent.agent_id]
-
-            if moved and self.is_shared_route((old_row, old_col)) and (old_row, old_col) != (fr, fc):
-                self.unlock(agent, (old_row, old_col))
-
-            agent.commit_final_position(fr, fc, moved)
-
-    def check_ghost_collisions(self, agents):
-        """On collision: apply penalties and respawn agent at its original start position."""
-        for agent in agents:
-            if not agent.is_active:
-                continue
-            for ghost in self.ghosts:
-                if not ghost.is_active:
-                    continue
-                if (agent.row, agent.col) == (ghost.row, ghost.col):
-                    print(f"[!!!] AGENT {agent.agent_id} CAUGHT BY GHOST {ghost.ghost_id}!")
-
-                    # Penalties
-                    agent.energy -= GHOST_CATCH_PENALTY
-                    agent.score = max(0, agent.score - 5)
-
-                    # Unlock corridor cell if collision happened there
-                    if self.is_shared_route((agent.row, agent.col)):
-                        self.unlock(agent, (agent.row, agent.col))
-
-                    # Respawn agent at original start position
-                    agent.row = agent.start_row
-                    agent.col = agent.start_col
-                    agent.next_row = agent.start_row
-                    agent.next_col = agent.start_col
-                    agent.path = []
-                    agent.wait_turns_remaining = 0
-                    agent.state = "ACTIVE"
-
-                    if agent.energy <= 0:
-                        agent.energy = 0
-                        agent.is_active = True
-
+# conflict_manager.py
+import random
+from config import *
+
+try:
+    import numpy as np
+except ImportError:  # only needed by the AgentStore path
+    np = None
+
+class ConflictManager:
+    def __init__(self, maze, agents, ghosts, episode_id, log_list, rng=None):
+        self.maze = maze
+        self.agents = {agent.agent_id: agent for agent in agents}
+        self.agent_order = {agent_id: i for i, agent_id in enumerate(self.agents)}
+        self.ghosts = ghosts
+        self.is_paused = False
+        self.verbose = True
+        self.agent_store = None   # AgentStore when USE_AGENT_STORE is on
+
+        # Lock holder / last unlocker per flat cell id (row * cols + col); None when free
+        self.shared_route_grid = self.maze.shared_route_grid
+        self.shared_route_locks = [None] * (self.maze.rows * self.maze.cols)
+        self.shared_route_last_unlock = [None] * (self.maze.rows * self.maze.cols)
+
+        self.reset(episode_id, log_list, rng)
+
+    def reset(self, episode_id, log_list, rng=None):
+        """Start episode episode_id with the same maze, agents and ghosts.
+
+        Call after the agents and ghosts were reset to their start cells.
+        """
+        self.rng = rng if rng is not None else random
+        self.conflict_count = 0              # post-move conflicts
+        self.negotiation_success = 0         # pre-move priority resolutions only
+        self.ghost_positions_cache = []
+        # One byte per cell (row * cols + col): 1 if within GHOST_AVOIDANCE_RADIUS of an active ghost
+        self.danger_map = bytearray(self.maze.rows * self.maze.cols)
+        self.game_result = None
+
+        # Locks can only be held on shared-route cells, so only those need clearing
+        cols = self.maze.cols
+        for r, c in self.maze.shared_route_cells:
+            self.shared_route_locks[r * cols + c] = None
+            self.shared_route_last_unlock[r * cols + c] = None
+        self.lock_conflict_events = 0
+
+        # Pre-move corridor intent index, rebuilt once per tick by index_intents()
+        self.corridor_claims = {}   # shared-route cell -> {agent_id: agent} whose lookahead claims it
+        self.claimed_cell = {}      # agent_id -> the shared-route cell it currently claims
+
+        # Occupancy grid, kept up to date on every move, respawn and (de)activation
+        self.agents_at = {}         # (row, col) -> {agent_id: agent} standing there
+        self.ghosts_at = {}         # (row, col) -> {ghost_id: ghost} for active ghosts
+        for agent in self.agents.values():
+            self._enter(self.agents_at, (agent.row, agent.col), agent.agent_id, agent)
+        for ghost in self.ghosts:
+            if ghost.is_active:
+                self._enter(self.ghosts_at, (ghost.row, ghost.col), ghost.ghost_id, ghost)
+
+        self.time_step = 0
+        self.episode_id = episode_id
+        self.log_list = log_list
+
+        self.predicted_conflict_events = 0   # number of pre-move predicted conflicts
+
+        # For average loser waiting time (per episode)
+        self.total_loser_wait_time = 0.0
+        self.total_conflicts_with_wait = 0
+
+    def update_ghost_positions(self):
+        positions = [(g.row, g.col) for g in self.ghosts if g.is_active]
+        if positions != self.ghost_positions_cache:
+            self.ghost_positions_cache = positions
+            self._rebuild_danger_map()
+
+    def _rebuild_danger_map(self):
+        # Only called when a ghost actually moved (ghosts act every GHOST_SPEED ticks)
+        rows, cols = self.maze.rows, self.maze.cols
+        danger = bytearray(rows * cols)
+        radius = GHOST_AVOIDANCE_RADIUS
+        for gr, gc in self.ghost_positions_cache:
+            for r in range(max(0, gr - radius), min(rows - 1, gr + radius) + 1):
+                span = radius - abs(r - gr)
+                c0 = max(0, gc - span)
+                c1 = min(cols - 1, gc + span)
+                danger[r * cols + c0:r * cols + c1 + 1] = b"\x01" * (c1 - c0 + 1)
+        self.danger_map = danger
+
+    # --- occupancy grid ---
+
+    @staticmethod
+    def _enter(grid, cell, key, occupant):
+        grid.setdefault(cell, {})[key] = occupant
+
+    @staticmethod
+    def _leave(grid, cell, key):
+        occupants = grid[cell]
+        del occupants[key]
+        if not occupants:
+            del grid[cell]
+
+    def move_agent(self, agent, old_cell):
+        """Re-file `agent` after its position changed from old_cell."""
+        cell = (agent.row, agent.col)
+        if cell != old_cell:
+            self._leave(self.agents_at, old_cell, agent.agent_id)
+            self._enter(self.agents_at, cell, agent.agent_id, agent)
+
+    def move_ghost(self, ghost, old_cell):
+        self._leave(self.ghosts_at, old_cell, ghost.ghost_id)
+        self._enter(self.ghosts_at, (ghost.row, ghost.col), ghost.ghost_id, ghost)
+
+    def ghost_activated(self, ghost):
+        self._enter(self.ghosts_at, (ghost.row, ghost.col), ghost.ghost_id, ghost)
+
+    def ghost_deactivated(self, ghost):
+        self._leave(self.ghosts_at, (ghost.row, ghost.col), ghost.ghost_id)
+
+    def agents_within(self, cell, radius):
+        """Agents within Manhattan distance `radius` of `cell`, found through the grid."""
+        row, col = cell
+        if 2 * radius * (radius + 1) + 1 > len(self.agents_at):
+            # Sparse population: scanning the occupied cells is cheaper than the diamond
+            cells = [c for c in self.agents_at if abs(c[0] - row) + abs(c[1] - col) <= radius]
+        else:
+            cells = [(r, c) for r in range(row - radius, row + radius + 1)
+                     for c in range(col - (radius - abs(r - row)), col + radius - abs(r - row) + 1)]
+        found = []
+        for c in cells:
+            occupants = self.agents_at.get(c)
+            if occupants:
+                found.extend(occupants.values())
+        return found
+
+    def nearest_active_agent(self, cell):
+        """Closest active agent to `cell`, ties going to the earlier agent; None if none left."""
+        row, col = cell
+        radius = max(1, SENSING_RADIUS)
+        while True:
+            found = [agent for agent in self.agents_within(cell, radius) if agent.is_active]
+            if found:
+                return min(found, key=lambda agent: (abs(agent.row - row) + abs(agent.col - col),
+                                                     self.agent_order[agent.agent_id]))
+            if radius >= self.maze.rows + self.maze.cols:
+                return None
+            radius *= 2
+
+    # --- pre-move intent index ---
+
+    def index_intents(self):
+        """Bucket every agent by the corridor cell its lookahead claims.
+
+        Called once per tick before agents decide; an agent that changes its path while
+        deciding refreshes its own entry with update_intent().
+        """
+        self.corridor_claims = {}
+        self.claimed_cell = {}
+        for agent in self.agents.values():
+            self.update_intent(agent)
+
+    def update_intent(self, agent):
+        """Re-file `agent` under its current predicted corridor cell and return that cell."""
+        old_cell = self.claimed_cell.pop(agent.agent_id, None)
+        if old_cell is not None:
+            del self.corridor_claims[old_cell][agent.agent_id]
+        prediction = agent.predict_next_move()
+        if prediction is None:
+            return None
+        cell = prediction[0]
+        self.claimed_cell[agent.agent_id] = cell
+        self.corridor_claims.setdefault(cell, {})[agent.agent_id] = agent
+        return cell
+
+    def corridor_candidates(self, cell):
+        """Agents standing on `cell` or claiming it, in self.agents order."""
+        found = dict(self.agents_at.get(cell, {}))
+        found.update(self.corridor_claims.get(cell, {}))
+        return sorted(found.values(), key=lambda other: self.agent_order[other.agent_id])
+
+    def is_shared_route(self, cell):
+        return self.shared_route_grid[cell[0] * self.maze.cols + cell[1]] == 1
+
+    def lock_holder(self, cell):
+        return self.shared_route_locks[cell[0] * self.maze.cols + cell[1]]
+
+    def lock(self, agent, cell):
+        index = cell[0] * self.maze.cols + cell[1]
+        if not self.shared_route_grid[index]:
+            return True
+        holder = self.shared_route_locks[index]
+        if holder is None or holder == agent.agent_id:
+            self.shared_route_locks[index] = agent.agent_id
+            return True
+        self.lock_conflict_events += 1
+        return False
+
+    def unlock(self, agent, cell):
+        index = cell[0] * self.maze.cols + cell[1]
+        if not self.shared_route_grid[index]:
+            return
+        if self.shared_route_locks[index] == agent.agent_id:
+            self.shared_route_locks[index] = None
+            self.shared_route_last_unlock[index] = agent.agent_id
+
+    # --- Strategy 1: Priority-based pre-move conflicts ---
+
+    def priority_metric(self, agent):
+        if PRIORITY_RULE == "highest_score":
+            return agent.score
+        elif PRIORITY_RULE == "lowest_energy":
+            return -agent.energy
+        return agent.score
+
+    def handle_priority_conflict(self, agent_a, agent_b, corridor_cell):
+        # Called when a pre-move corridor conflict is predicted
+        self.predicted_conflict_events += 1
+
+        m_a = self.priority_metric(agent_a)
+        m_b = self.priority_metric(agent_b)
+
+        if m_a > m_b:
+            winner, loser = agent_a, agent_b
+        elif m_b > m_a:
+            winner, loser = agent_b, agent_a
+        else:
+            winner, loser = self.rng.sample([agent_a, agent_b], 2)
+
+        loser.wait_turns_remaining = max(loser.wait_turns_remaining, BASELINE_WAIT_TURNS)
+        loser.score = max(0, loser.score - BASELINE_LOSER_PENALTY)
+
+        # Update episode-level wait-time stats
+        self.total_loser_wait_time += BASELINE_WAIT_TURNS
+        self.total_conflicts_with_wait += 1
+
+        # Count as a successful negotiation (pre-move)
+        self.negotiation_success += 1
+
+        # Log this pre-move conflict (one row per event)
+        log_entry = {
+            "episode": self.episode_id,
+            "time_step": self.time_step,
+            "strategy": NEGOTIATION_MODE,
+            "conflict_type": "pre_move",
+            "winner_id": winner.agent_id,
+            "loser_id": loser.agent_id,
+            "loser_wait_turns": BASELINE_WAIT_TURNS,
+            "negotiation_rounds": 1,
+            "final_outcome": "success",
+            "corridor_row": corridor_cell[0],
+            "corridor_col": corridor_cell[1]
+        }
+        self.log_list.append(log_entry)
+        return winner
+
+    def _apply_fallback_rule(self, agent):
+        if not agent.is_active:
+            return
+        agent.score = max(0, agent.score - 3)
+        agent.energy -= SHARED_ROUTE_PENALTY // 2
+        if agent.energy <= 0:
+            agent.energy = 0
+            agent.is_active = False
+
+    def resolve_path_conflicts(self, agents):
+        if self.agent_store is not None:
+            self._resolve_path_conflicts_bulk(agents)
+            return
+
+        target_map = {}
+        for agent in agents:
+            if not agent.is_active:
+                continue
+            tr, tc = agent.next_row, agent.next_col
+            if (tr, tc) != (agent.row, agent.col):
+                target_map.setdefault((tr, tc), []).append(agent)
+
+        final_positions = {agent.agent_id: (agent.row, agent.col) for agent in agents}
+        moved_flags = {agent.agent_id: False for agent in agents}
+
+        for cell, contenders in target_map.items():
+            ghost_occupied = cell in self.ghosts_at
+
+            if self.is_shared_route(cell):
+                current_holder = self.lock_holder(cell)
+                if current_holder is not None and all(a.agent_id != current_holder for a in contenders):
+                    for a in contenders:
+                        self.lock_conflict_events += 1
+                    continue
+
+            if len(contenders) == 1 and not ghost_occupied:
+                a = contenders[0]
+                if self.is_shared_route(cell):
+                    if not self.lock(a, cell):
+                        continue
+                final_positions[a.agent_id] = cell
+                moved_flags[a.agent_id] = True
+                continue
+
+            # --- POST-MOVE CONFLICT ---
+            self.conflict_count += 1
+
+            if ghost_occupied:
+                continue
+
+            def priority(a):
+                return a.score - (a.energy / MAX_ENERGY) * 0.5
+
+            contenders_sorted = sorted(contenders, key=lambda a: priority(a))
+            winner = contenders_sorted[0]
+
+            if len(contenders_sorted) > 1 and abs(priority(contenders_sorted[0]) - priority(contenders_sorted[1])) < 0.15:
+                if self.rng.random() < 0.25:
+                    winner = contenders_sorted[1]
+
+            if self.is_shared_route(cell):
+                if not self.lock(winner, cell):
+                    continue
+
+            # Note: post-move resolutions are NOT counted as "negotiation_success"
+            final_positions[winner.agent_id] = cell
+            moved_flags[winner.agent_id] = True
+            winner.conflict_wins += 1
+
+            equal_priorities = all(abs(priority(a) - priority(contenders_sorted[0])) < 1e-6 for a in contenders)
+            if equal_priorities:
+                if self.rng.random() > LOTTERY_FAIL_CHANCE:
+                    chosen = self.rng.choice(contenders)
+                    final_positions[chosen.agent_id] = cell
+                    moved_flags[chosen.agent_id] = True
+                    chosen.conflict_wins += 1
+                else:
+                    for a in contenders:
+                        self._apply_fallback_rule(a)
+
+        # commit_final_position is a no-op for agents that stay put, so only movers are visited
+        moved_agents = []
+        for agent in agents:
+            if not agent.is_active or not moved_flags[agent.agent_id]:
+                continue
+            old_row, old_col = agent.row, agent.col
+            fr, fc = final_positions[agent.agent_id]
+            if self.is_shared_route((old_row, old_col)) and (old_row, old_col) != (fr, fc):
+                self.unlock(agent, (old_row, old_col))
+            moved_agents.append(agent)
+
+        for agent in moved_agents:
+            fr, fc = final_positions[agent.agent_id]
+            agent.commit_final_position(fr, fc, True)
+
+    def _resolve_path_conflicts_bulk(self, agents):
+        """resolve_path_conflicts over AgentStore columns.
+
+        Targets are flat cell ids grouped with one stable sort; lock checks, single-mover
+        cells, priorities, the 0.15-gap and equal-priority tests are array operations.
+        Only contested cells are visited one by one, in the order the dict version
+        visits them, so the RNG draws and therefore the results are the same.
+        """
+        store = self.agent_store
+        cols = self.maze.cols
+        pos = store.row * cols + store.col
+        target = store.next_row * cols + store.next_col
+        movers = np.flatnonzero(store.is_active & ~store.in_conflict & (target != pos))
+        if movers.size == 0:
+            return
+
+        order = movers[np.argsort(target[movers], kind="stable")]
+        cells, starts, counts = np.unique(target[order], return_index=True, return_counts=True)
+        group = np.repeat(np.arange(cells.size), counts)
+        # The dict version visits cells in order of their first mover
+        visit = np.argsort(order[starts], kind="stable")
+
+        shared = np.frombuffer(self.shared_route_grid, dtype=np.uint8)[cells] == 1
+        holders = np.full(cells.size, -1, dtype=np.int64)
+        for i in np.flatnonzero(shared).tolist():
+            holder = self.shared_route_locks[int(cells[i])]
+            if holder is not None:
+                holders[i] = holder
+        holder_moving = np.logical_or.reduceat(store.agent_ids[order] == holders[group], starts)
+        locked_out = (holders != -1) & ~holder_moving
+        self.lock_conflict_events += int(counts[locked_out].sum())
+
+        ghost_cells = [r * cols + c for r, c in self.ghosts_at]
+        ghost = np.isin(cells, ghost_cells)
+        single = ~locked_out & (counts == 1) & ~ghost
+        contested = ~locked_out & ~single
+        self.conflict_count += int(contested.sum())
+
+        moved = np.zeros(store.size, dtype=bool)
+        moved[order[starts[single]]] = True
+        # A lone mover always gets the lock: any holder is either absent or the mover itself
+        for i in np.flatnonzero(single & shared).tolist():
+            self.lock(agents[int(order[starts[i]])], divmod(int(cells[i]), cols))
+
+        contest = contested & ~ghost
+        if contest.any():
+            priority = store.score - (store.energy / MAX_ENERGY) * 0.5
+            ranked = order[np.lexsort((priority[order], group))]
+            best = ranked[starts]
+            second = ranked[np.minimum(starts + 1, order.size - 1)]
+            close = (counts > 1) & (np.abs(priority[best] - priority[second]) < 0.15)
+            spread = np.maximum.reduceat(np.abs(priority[order] - priority[best][group]), starts)
+            equal = spread < 1e-6
+
+            for g in visit[contest[visit]].tolist():
+                cell = divmod(int(cells[g]), cols)
+                members = order[starts[g]:starts[g] + counts[g]].tolist()
+                winner = int(best[g])
+                if close[g]:
+                    if self.rng.random() < 0.25:
+                        winner = int(second[g])
+
+                if shared[g]:
+                    if not self.lock(agents[winner], cell):
+                        continue
+                moved[winner] = True
+                agents[winner].conflict_wins += 1
+
+                if equal[g]:
+                    contenders = [agents[i] for i in members]
+                    if self.rng.random() > LOTTERY_FAIL_CHANCE:
+                        chosen = self.rng.choice(contenders)
+                        moved[chosen.index] = True
+                        chosen.conflict_wins += 1
+                    else:
+                        for a in contenders:
+                            self._apply_fallback_rule(a)
+
+        # Fallbacks above may have dropped a mover out; those stay put
+        index = np.flatnonzero(moved & store.is_active)
+        grid = np.frombuffer(self.shared_route_grid, dtype=np.uint8)
+        for i in index[grid[pos[index]] == 1].tolist():
+            self.unlock(agents[i], (int(store.row[i]), int(store.col[i])))
+        store.commit_moves(index, target[index])
+
+    def check_ghost_collisions(self, agents):
+        """On collision: apply penalties and respawn agent at its original start position."""
+        # Only agents standing on an active ghost's cell can be caught
+        caught = [agent for cell in self.ghosts_at
+                  for agent in self.agents_at.get(cell, {}).values() if agent.is_active]
+        caught.sort(key=lambda agent: self.agent_order[agent.agent_id])
+        for agent in caught:
+            for ghost in self.ghosts:
+                if not ghost.is_active:
+                    continue
+                cell = (agent.row, agent.col)
+                if cell == (ghost.row, ghost.col):
+                    if self.verbose:
+                        print(f"[!!!] AGENT {agent.agent_id} CAUGHT BY GHOST {ghost.ghost_id}!")
+
+                    # Penalties
+                    agent.energy -= GHOST_CATCH_PENALTY
+                    agent.score = max(0, agent.score - 5)
+
+                    # Unlock corridor cell if collision happened there
+                    if self.is_shared_route((agent.row, agent.col)):
+                        self.unlock(agent, (agent.row, agent.col))
+
+                    # Respawn agent at original start position
+                    agent.row = agent.start_row
+                    agent.col = agent.start_col
+                    self.move_agent(agent, cell)
+                    agent.next_row = agent.start_row
+                    agent.next_col = agent.start_col
+                    agent.path.clear()
+                    agent.wait_turns_remaining = 0
+                    agent.state = "ACTIVE"
+
+                    if agent.energy <= 0:
+                        agent.energy = 0
+                        agent.is_active = True
+
                     ghost.respawn()
\ No newline at end of file
@@ -1,70 +1,254 @@
-# maze.py
-import pygame
-import random
-from config import *
-
-class Maze:
-    def __init__(self, screen):
-        self.screen = screen
-        self.walls = []
-        self.corridors = {}
-        self.layout = MAZE_LAYOUT
-        self.rows = len(MAZE_LAYOUT)
-        self.cols = len(MAZE_LAYOUT[0])
-
-        self.shared_route_cells = set()
-
-        all_walkable = []
-        for row_idx, row in enumerate(MAZE_LAYOUT):
-            for col_idx, cell in enumerate(row):
-                rect = pygame.Rect(
-                    col_idx * CELL_SIZE, row_idx * CELL_SIZE,
-                    CELL_SIZE, CELL_SIZE
-                )
-                if cell == "#":
-                    self.walls.append(rect)
-                elif cell == ".":
-                    all_walkable.append((row_idx, col_idx))
-                elif cell == "C":
-                    all_walkable.append((row_idx, col_idx))
-                    self.corridors[(row_idx, col_idx)] = rect
-                    self.shared_route_cells.add((row_idx, col_idx))
-
-        available_pellet_spots = set(all_walkable)
-        FIXED_EXCLUSIONS = set(START_POSITIONS + GHOST_START_POSITIONS)
-        CUSTOM_EXCLUSIONS = set([
-            (1, 29), (17, 15)
-        ]).union(RED_LINE_EXCLUSION)
-        all_exclusions = FIXED_EXCLUSIONS.union(CUSTOM_EXCLUSIONS)
-        for pos in all_exclusions:
-            if pos in available_pellet_spots:
-                available_pellet_spots.remove(pos)
-        num_pellets_to_place = max(0, int(len(available_pellet_spots) * PELLET_SPAWN_RATIO))
-        if num_pellets_to_place > len(available_pellet_spots):
-            num_pellets_to_place = len(available_pellet_spots)
-        self.pellets = set(random.sample(list(available_pellet_spots), num_pellets_to_place)) if num_pellets_to_place else set()
-
-    def is_wall(self, row, col):
-        if 0 <= row < self.rows and 0 <= col < self.cols:
-            cell = self.layout[row][col]
-            return cell == "#"
-        return True
-
-    def draw_maze(self, manager=None):
-        for (r, c), rect in self.corridors.items():
-            color = CORRIDOR_FLOOR_COLOR
-            if manager is not None:
-                lock_owner = manager.shared_route_locks.get((r, c), None)
-                if lock_owner is None:
-                    color = (0, 180, 0)
-                else:
-                    color = (200, 40, 40)
-            pygame.draw.rect(self.screen, color, rect)
-
-        for wall in self.walls:
-            pygame.draw.rect(self.screen, WALL_COLOR, wall)
-
-        for r, c in self.pellets:
-            center_x = c * CELL_SIZE + CELL_SIZE // 2
-            center_y = r * CELL_SIZE + CELL_SIZE // 2
-            pygame.draw.circle(self.screen, (255, 255, 255), (center_x, center_y), 4)
\ No newline at end of file
+# maze.py
+import pygame
+import random
+import heapq
+from collections import deque
+from config import *
+from maze_file import CompiledMaze, compile_layout, default_exclusions
+
+# Neighbour order of Maze.walkable_neighbours and Maze.neighbour_steps
+DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+class Maze:
+    def __init__(self, screen, rng=None, start_cells=None, layout=None, exclusions=None):
+        self.screen = screen
+        # Walls, shared routes and neighbour tables (maze_file.CompiledMaze). Rows of
+        # "#" / "." / "C" strings are compiled here; MAZE_LAYOUT unless another maze is given
+        if layout is None:
+            layout = MAZE_LAYOUT
+        if not isinstance(layout, CompiledMaze):
+            layout = compile_layout(layout)
+        self.compiled = layout
+        self.rows = layout.rows
+        self.cols = layout.cols
+        self.wall_grid = layout.wall_grid
+        self.shared_route_grid = layout.shared_route_grid
+        # neighbour_steps[(dr, dc)][cell] is the id of the walkable cell one step away
+        # in that direction, or -1 for a wall or the edge of the maze
+        self.neighbour_steps = layout.neighbour_steps
+        self.neighbours = layout.neighbours
+
+        self.shared_route_cells = set(layout.shared_route_cells)
+        self.corridors = {cell: self.cell_rect(*cell) for cell in layout.shared_route_cells}
+
+        # Scratch arrays for Agent.bfs_find_path, indexed by row * cols + col.
+        # A cell counts as visited only when bfs_seen matches the current bfs_stamp,
+        # so the arrays are allocated once and never cleared between searches.
+        self.bfs_parent = [0] * (self.rows * self.cols)
+        self.bfs_seen = [0] * (self.rows * self.cols)
+        self.bfs_stamp = 0
+        # Work done by every search so far (cells popped, danger_map reads); the
+        # profiler reads the change over each call
+        self.bfs_expanded = 0
+        self.bfs_danger_checks = 0
+
+        # One byte per cell (row * cols + col): 1 while a pellet is there
+        self.pellet_grid = bytearray(self.rows * self.cols)
+        self.pellets = set()
+        self.pellet_cells_key = None    # (start cells, exclusions) pellet_cells was built for
+        self.pellet_cells = None
+
+        self.reset(rng, start_cells, exclusions)
+
+    def reset(self, rng=None, start_cells=None, exclusions=None):
+        """Place a fresh set of pellets for a new episode.
+
+        Walls, neighbour tables and BFS scratch arrays are kept; only the pellets, their
+        distance field and the GUI layer start over.
+        """
+        self.rng = rng if rng is not None else random
+        # GUI layer, built by the first draw_maze() call
+        self.layer = None
+        self.dirty_cells = []
+
+        if start_cells is None:
+            start_cells = START_POSITIONS + GHOST_START_POSITIONS
+        # Cells kept free of pellets besides the starts: the maze file's, else the
+        # defaults for MAZE_LAYOUT (none for other layouts)
+        if exclusions is None:
+            exclusions = self.compiled.exclusions()
+        if exclusions is None:
+            exclusions = default_exclusions(self.compiled)
+        key = (tuple(start_cells), frozenset(exclusions))
+        if key != self.pellet_cells_key:
+            available = set(self.compiled.walkable_cells())
+            FIXED_EXCLUSIONS = set(start_cells)
+            CUSTOM_EXCLUSIONS = set(exclusions)
+            for pos in FIXED_EXCLUSIONS.union(CUSTOM_EXCLUSIONS):
+                if pos in available:
+                    available.remove(pos)
+            # Same starts and exclusions give the same list, so it is kept for the
+            # next episode (sampled in this order, the pellets stay seed-for-seed equal)
+            self.pellet_cells = list(available)
+            self.pellet_cells_key = key
+        available = self.pellet_cells
+        n_pellets = max(0, int(len(available) * PELLET_SPAWN_RATIO))
+        if n_pellets > len(available):
+            n_pellets = len(available)
+
+        for r, c in self.pellets:
+            self.pellet_grid[r * self.cols + c] = 0
+        self.pellets = set(self.rng.sample(available, n_pellets)) if n_pellets else set()
+        for r, c in self.pellets:
+            self.pellet_grid[r * self.cols + c] = 1
+
+        self.build_pellet_distance_field()
+
+    def is_wall(self, row, col):
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.wall_grid[row * self.cols + col] == 1
+        return True
+
+    def walkable_neighbours(self, cell):
+        return self.neighbours[cell]
+
+    # --- Distance-to-nearest-pellet field (shared by all agents) ---
+
+    def build_pellet_distance_field(self):
+        """Multi-source BFS from every pellet over the static walls."""
+        unreachable = self.rows * self.cols
+        dist = [unreachable] * unreachable
+        neighbours = self.neighbours
+        queue = deque()
+        for r, c in self.pellets:
+            cell = r * self.cols + c
+            dist[cell] = 0
+            queue.append(cell)
+        while queue:
+            cell = queue.popleft()
+            d = dist[cell] + 1
+            for nxt in neighbours[cell]:
+                if dist[nxt] > d:
+                    dist[nxt] = d
+                    queue.append(nxt)
+        self.pellet_distance = dist
+        self.unreachable_distance = unreachable
+
+    def remove_pellet(self, row, col):
+        """Remove a pellet and repair only the part of the field that depended on it."""
+        self.pellets.remove((row, col))
+        self.pellet_grid[row * self.cols + col] = 0
+        if self.layer is not None:
+            self.dirty_cells.append((row, col))
+        dist = self.pellet_distance
+        unreachable = self.unreachable_distance
+        source = row * self.cols + col
+
+        # Level by level, a cell loses its distance when none of its neighbours one
+        # step closer to a pellet is still valid.
+        affected = {source}
+        level = [source]
+        while level:
+            candidates = set()
+            for cell in level:
+                d = dist[cell] + 1
+                for nxt in self.walkable_neighbours(cell):
+                    if dist[nxt] == d and nxt not in affected:
+                        candidates.add(nxt)
+            level = []
+            for cell in candidates:
+                d = dist[cell] - 1
+                if not any(dist[n] == d and n not in affected for n in self.walkable_neighbours(cell)):
+                    level.append(cell)
+            affected.update(level)
+
+        # Re-seed the invalidated cells from their valid neighbours and relax inwards.
+        heap = []
+        for cell in affected:
+            best = unreachable
+            for n in self.walkable_neighbours(cell):
+                if n not in affected and dist[n] + 1 < best:
+                    best = dist[n] + 1
+            dist[cell] = best
+            if best < unreachable:
+                heap.append((best, cell))
+        heapq.heapify(heap)
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if d != dist[cell]:
+                continue
+            for n in self.walkable_neighbours(cell):
+                if n in affected and dist[n] > d + 1:
+                    dist[n] = d + 1
+                    heapq.heappush(heap, (d + 1, n))
+
+    def pellet_path_from(self, row, col, directions):
+        """Descend the field to the nearest pellet. Ties follow `directions`; None if unreachable."""
+        dist = self.pellet_distance
+        cols = self.cols
+        cell = row * cols + col
+        d = dist[cell]
+        if d >= self.unreachable_distance:
+            return None
+        steps = [self.neighbour_steps[direction] for direction in directions]
+        path = deque()
+        while d > 0:
+            for step in steps:
+                nxt = step[cell]
+                if nxt >= 0 and dist[nxt] == d - 1:
+                    break
+            cell = nxt
+            path.append(divmod(cell, cols))
+            d -= 1
+        return path
+
+    # --- Rendering ---
+    # Walls and floor never change, so they are rendered once per layout and shared
+    # by every Maze built from it. Each Maze keeps its own layer (background +
+    # corridor lock colours + pellets) and only redraws the cells that changed.
+
+    _background_cache = {}
+
+    def background(self):
+        key = (self.compiled.key, CELL_SIZE)
+        surface = Maze._background_cache.get(key)
+        if surface is None:
+            surface = pygame.Surface((self.cols * CELL_SIZE, self.rows * CELL_SIZE))
+            surface.fill(BLACK)
+            for cell in range(self.rows * self.cols):
+                if self.wall_grid[cell]:
+                    pygame.draw.rect(surface, WALL_COLOR, self.cell_rect(*divmod(cell, self.cols)))
+            Maze._background_cache[key] = surface
+        return surface
+
+    def cell_rect(self, row, col):
+        return pygame.Rect(col * CELL_SIZE, row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+    def _corridor_color(self, cell, manager):
+        if manager is None:
+            return CORRIDOR_FLOOR_COLOR
+        lock_owner = manager.shared_route_locks[cell[0] * self.cols + cell[1]]
+        return (0, 180, 0) if lock_owner is None else (200, 40, 40)
+
+    def _draw_cell(self, cell, manager):
+        rect = self.cell_rect(*cell)
+        self.layer.blit(self.background(), rect, rect)
+        if cell in self.corridors:
+            color = self._corridor_color(cell, manager)
+            pygame.draw.rect(self.layer, color, rect)
+            self.drawn_corridor_colors[cell] = color
+        if cell in self.pellets:
+            pygame.draw.circle(self.layer, (255, 255, 255), rect.center, 4)
+        return rect
+
+    def draw_maze(self, manager=None):
+        """Blit the maze to the screen; returns the rects that changed since the last call."""
+        if self.layer is None:
+            self.layer = self.background().copy()
+            self.drawn_corridor_colors = {}
+            for cell in self.corridors:
+                self._draw_cell(cell, manager)
+            for cell in self.pellets:
+                self._draw_cell(cell, manager)
+            self.dirty_cells = []
+            dirty = [self.layer.get_rect()]
+        else:
+            # Eaten pellets plus corridors whose lock colour changed
+            cells = set(self.dirty_cells)
+            self.dirty_cells = []
+            for cell, color in self.drawn_corridor_colors.items():
+                if self._corridor_color(cell, manager) != color:
+                    cells.add(cell)
+            dirty = [self._draw_cell(cell, manager) for cell in cells]
+        self.screen.blit(self.layer, (0, 0))
+        return dirty
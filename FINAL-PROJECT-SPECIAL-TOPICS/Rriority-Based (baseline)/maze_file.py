@@ -0,0 +1,355 @@
+# maze_file.py
+"""Maze layouts compiled to flat tables, loadable from text files through a cache.
+
+compile_layout() turns layout rows ("#" wall, "." floor, "C" shared route) into a
+CompiledMaze: wall and shared-route bytes, the walkable cell ids, one neighbour
+table per direction, adjacency lists and the pellet exclusions, all indexed by flat
+cell id (row * cols + col). Maze is built from a CompiledMaze.
+
+A maze file holds the layout rows plus optional directives; ";" starts a comment:
+
+    agents: 1,1 1,29 17,15
+    ghosts: 9,1 9,29
+    exclude: 1,2 1,3
+    ###############
+    #.....C.......#
+    ###############
+
+load_maze() compiles a file once and saves the tables to MAZE_CACHE_DIR (next to
+the maze file) under a hash of the file's contents. Later loads, in any process,
+memory-map that cache file instead of parsing the text, so a huge maze opens at
+once and worker processes share its pages instead of each holding a copy.
+
+    python maze_file.py my.maze                      # compile into the cache
+    python maze_file.py --write-default default.maze  # MAZE_LAYOUT as a maze file
+"""
+import argparse
+import array
+import hashlib
+import json
+import mmap
+import os
+import sys
+from config import *
+
+CACHE_VERSION = 1
+CACHE_MAGIC = b"MAZEBIN1"
+CACHE_SUFFIX = ".mazebin"
+ALIGN = 8
+CELL_CHARS = "#.C"
+WALL_CHARS = bytes.maketrans(b"\x00\x01", b".#")
+
+# Pellet exclusions of MAZE_LAYOUT (see default_exclusions())
+DEFAULT_EXCLUSIONS = set([(1, 29), (17, 15)]).union(RED_LINE_EXCLUSION)
+
+# Neighbour table per direction, in the order of maze.DIRECTIONS
+STEP_TABLES = (((0, 1), "step_right"), ((0, -1), "step_left"),
+               ((1, 0), "step_down"), ((-1, 0), "step_up"))
+# Cache file sections: name -> memoryview format ("B" bytes, "i" int32 cell ids)
+SECTIONS = {
+    "wall_grid": "B",
+    "shared_route_grid": "B",
+    "walkable": "i",
+    "exclusions": "i",
+    "step_right": "i",
+    "step_left": "i",
+    "step_down": "i",
+    "step_up": "i",
+    "adjacency_start": "i",
+    "adjacency": "i",
+}
+
+
+class Adjacency:
+    """neighbours[cell] over adjacency lists packed into two flat int tables."""
+
+    __slots__ = ("start", "targets")
+
+    def __init__(self, start, targets):
+        self.start = start
+        self.targets = targets
+
+    def __getitem__(self, cell):
+        return self.targets[self.start[cell]:self.start[cell + 1]]
+
+    def __len__(self):
+        return len(self.start) - 1
+
+
+class CompiledMaze:
+    """Read-only maze structure shared by every Maze built from it.
+
+    The tables are Python lists and bytes when compiled in memory, and read-only
+    memoryviews into the cache file when loaded through load_maze().
+    """
+
+    def __init__(self, rows, cols, key, tables, neighbours, agent_starts=(),
+                 ghost_starts=(), has_exclusions=False, path=None):
+        self.rows = rows
+        self.cols = cols
+        self.key = key                  # hash of the layout rows
+        self.wall_grid = tables["wall_grid"]
+        self.shared_route_grid = tables["shared_route_grid"]
+        self.walkable = tables["walkable"]
+        self.neighbour_steps = {direction: tables[name] for direction, name in STEP_TABLES}
+        self.neighbours = neighbours    # neighbours[cell]: walkable neighbour ids
+        self.exclusion_ids = tables["exclusions"]
+        self.agent_starts = [tuple(cell) for cell in agent_starts]
+        self.ghost_starts = [tuple(cell) for cell in ghost_starts]
+        # Without an "exclude:" directive Maze keeps its default exclusions
+        self.has_exclusions = has_exclusions
+        self.path = path                # cache file, when memory-mapped
+        self._layout = None
+        self._shared_route_cells = None
+
+    def __deepcopy__(self, memo):
+        # Never modified, so copies of a Maze share it. Its tables are registered as
+        # already copied too: Maze and ConflictManager hold them directly, after the
+        # CompiledMaze itself, and memoryviews cannot be copied.
+        tables = [self.wall_grid, self.shared_route_grid, self.walkable, self.exclusion_ids,
+                  self.neighbour_steps, self.neighbours, *self.neighbour_steps.values()]
+        for table in tables:
+            memo[id(table)] = table
+        return self
+
+    @property
+    def layout(self):
+        """The layout rows, rebuilt from the tables on first use."""
+        if self._layout is None:
+            chars = bytearray(bytes(self.wall_grid).translate(WALL_CHARS))
+            shared = bytes(self.shared_route_grid)
+            cell = shared.find(1)
+            while cell >= 0:
+                chars[cell] = ord("C")
+                cell = shared.find(1, cell + 1)
+            cols = self.cols
+            self._layout = [chars[r * cols:(r + 1) * cols].decode() for r in range(self.rows)]
+        return self._layout
+
+    def walkable_cells(self):
+        """(row, col) of every walkable cell, row by row."""
+        cols = self.cols
+        return [divmod(cell, cols) for cell in self.walkable]
+
+    @property
+    def shared_route_cells(self):
+        """(row, col) of every "C" cell, row by row."""
+        if self._shared_route_cells is None:
+            shared = bytes(self.shared_route_grid)
+            cells = []
+            cell = shared.find(1)
+            while cell >= 0:
+                cells.append(divmod(cell, self.cols))
+                cell = shared.find(1, cell + 1)
+            self._shared_route_cells = cells
+        return self._shared_route_cells
+
+    def exclusions(self):
+        """Cells to keep free of pellets, or None for Maze's defaults."""
+        if not self.has_exclusions:
+            return None
+        cols = self.cols
+        return {divmod(cell, cols) for cell in self.exclusion_ids}
+
+
+def layout_key(layout):
+    return hashlib.sha256("\n".join(layout).encode()).hexdigest()
+
+
+MAZE_LAYOUT_KEY = layout_key(MAZE_LAYOUT)
+
+
+def default_exclusions(compiled):
+    """Exclusions for a maze that brings none: DEFAULT_EXCLUSIONS on MAZE_LAYOUT,
+    none on any other layout (those cells mean nothing there)."""
+    return DEFAULT_EXCLUSIONS if compiled.key == MAZE_LAYOUT_KEY else set()
+
+
+def compile_layout(layout, agent_starts=(), ghost_starts=(), exclusions=None):
+    """CompiledMaze of layout rows, held in memory as lists."""
+    rows, cols = len(layout), len(layout[0])
+    for r, line in enumerate(layout):
+        if len(line) != cols:
+            raise ValueError(f"maze row {r} has {len(line)} cells, expected {cols}")
+    text = "".join(layout)
+    if text.strip(CELL_CHARS):
+        raise ValueError(f"maze cells must be one of {CELL_CHARS!r}")
+    wall_grid = bytearray(text.encode().translate(bytes.maketrans(b"#.C", b"\x01\x00\x00")))
+    shared_route_grid = bytearray(text.encode().translate(bytes.maketrans(b"#.C", b"\x00\x00\x01")))
+    walkable = [cell for cell, wall in enumerate(wall_grid) if not wall]
+
+    tables = {"wall_grid": wall_grid, "shared_route_grid": shared_route_grid,
+              "walkable": walkable}
+    for (dr, dc), name in STEP_TABLES:
+        steps = [-1] * (rows * cols)
+        for r in range(max(0, -dr), min(rows, rows - dr)):
+            for c in range(max(0, -dc), min(cols, cols - dc)):
+                nxt = (r + dr) * cols + c + dc
+                if not wall_grid[nxt]:
+                    steps[r * cols + c] = nxt
+        tables[name] = steps
+    step_tables = [tables[name] for _, name in STEP_TABLES]
+    neighbours = [
+        () if wall_grid[cell] else tuple(t[cell] for t in step_tables if t[cell] >= 0)
+        for cell in range(rows * cols)
+    ]
+    tables["exclusions"] = sorted(r * cols + c for r, c in exclusions or ())
+    return CompiledMaze(rows, cols, layout_key(layout), tables, neighbours, agent_starts,
+                        ghost_starts, exclusions is not None)
+
+
+# --- Maze files ---
+
+def parse_cells(text):
+    cells = []
+    for item in text.split():
+        row, col = item.split(",")
+        cells.append((int(row), int(col)))
+    return cells
+
+
+def read_maze_file(path):
+    """(layout rows, agent starts, ghost starts, exclusions or None) of a maze file."""
+    layout, directives = [], {}
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.split(";", 1)[0].strip()
+            if not line:
+                continue
+            if ":" in line:
+                name, _, value = line.partition(":")
+                name = name.strip().lower()
+                if name not in ("agents", "ghosts", "exclude"):
+                    raise ValueError(f"{path}:{number}: unknown directive {name!r}")
+                try:
+                    directives.setdefault(name, []).extend(parse_cells(value))
+                except ValueError:
+                    raise ValueError(f"{path}:{number}: expected row,col pairs") from None
+            else:
+                layout.append(line)
+    if not layout:
+        raise ValueError(f"{path}: no maze rows")
+    return (layout, directives.get("agents", []), directives.get("ghosts", []),
+            set(directives["exclude"]) if "exclude" in directives else None)
+
+
+def write_maze_file(path, layout, agent_starts=(), ghost_starts=(), exclusions=None):
+    def cells(values):
+        return " ".join(f"{r},{c}" for r, c in values)
+
+    with open(path, "w") as f:
+        if agent_starts:
+            f.write(f"agents: {cells(agent_starts)}\n")
+        if ghost_starts:
+            f.write(f"ghosts: {cells(ghost_starts)}\n")
+        if exclusions is not None:
+            f.write(f"exclude: {cells(sorted(exclusions))}\n")
+        f.writelines(row + "\n" for row in layout)
+
+
+# --- Compiled cache ---
+
+def cache_path(path, cache_dir=MAZE_CACHE_DIR):
+    """Cache file for the current contents of maze file `path`."""
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_VERSION} {sys.byteorder}\n".encode())
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), cache_dir)
+    return os.path.join(directory, digest.hexdigest() + CACHE_SUFFIX)
+
+
+def write_cache(filename, compiled):
+    """Save the tables of an in-memory CompiledMaze; atomic, so loaders never see half a file."""
+    start, targets = [0], []
+    for cell_neighbours in compiled.neighbours:
+        targets.extend(cell_neighbours)
+        start.append(len(targets))
+    tables = {
+        "wall_grid": compiled.wall_grid,
+        "shared_route_grid": compiled.shared_route_grid,
+        "walkable": compiled.walkable,
+        "exclusions": compiled.exclusion_ids,
+        "adjacency_start": start,
+        "adjacency": targets,
+    }
+    for direction, name in STEP_TABLES:
+        tables[name] = compiled.neighbour_steps[direction]
+    blobs = {name: bytes(tables[name]) if fmt == "B" else array.array(fmt, tables[name]).tobytes()
+             for name, fmt in SECTIONS.items()}
+
+    header = {
+        "version": CACHE_VERSION,
+        "rows": compiled.rows,
+        "cols": compiled.cols,
+        "key": compiled.key,
+        "agent_starts": compiled.agent_starts,
+        "ghost_starts": compiled.ghost_starts,
+        "has_exclusions": compiled.has_exclusions,
+        "sections": {},
+    }
+    offset = 0
+    for name, blob in blobs.items():
+        header["sections"][name] = [offset, len(blob)]
+        offset += -(-len(blob) // ALIGN) * ALIGN
+    header_bytes = json.dumps(header).encode()
+    data_start = -(-(len(CACHE_MAGIC) + 8 + len(header_bytes)) // ALIGN) * ALIGN
+
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(CACHE_MAGIC)
+        f.write(len(header_bytes).to_bytes(8, "little"))
+        f.write(header_bytes)
+        for name, blob in blobs.items():
+            f.seek(data_start + header["sections"][name][0])
+            f.write(blob)
+    os.replace(tmp, filename)
+
+
+def map_cache(filename):
+    """CompiledMaze whose tables are read-only views into the memory-mapped cache file."""
+    with open(filename, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if data[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+        raise ValueError(f"{filename}: not a compiled maze")
+    size = int.from_bytes(data[len(CACHE_MAGIC):len(CACHE_MAGIC) + 8], "little")
+    start = len(CACHE_MAGIC) + 8
+    header = json.loads(data[start:start + size])
+    data_start = -(-(start + size) // ALIGN) * ALIGN
+    view = memoryview(data)
+    tables = {}
+    for name, fmt in SECTIONS.items():
+        offset, length = header["sections"][name]
+        section = view[data_start + offset:data_start + offset + length]
+        tables[name] = section if fmt == "B" else section.cast(fmt)
+    neighbours = Adjacency(tables["adjacency_start"], tables["adjacency"])
+    return CompiledMaze(header["rows"], header["cols"], header["key"], tables, neighbours,
+                        header["agent_starts"], header["ghost_starts"],
+                        header["has_exclusions"], filename)
+
+
+def load_maze(path, cache_dir=MAZE_CACHE_DIR):
+    """CompiledMaze of maze file `path`, compiling it into the cache on first use."""
+    filename = cache_path(path, cache_dir)
+    if not os.path.exists(filename):
+        write_cache(filename, compile_layout(*read_maze_file(path)))
+    return map_cache(filename)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile maze files into the maze cache.")
+    parser.add_argument("paths", nargs="*", help="maze files")
+    parser.add_argument("--write-default", metavar="PATH",
+                        help="write MAZE_LAYOUT with its start cells and exclusions to PATH")
+    args = parser.parse_args()
+
+    if args.write_default:
+        write_maze_file(args.write_default, MAZE_LAYOUT, START_POSITIONS,
+                        GHOST_START_POSITIONS, DEFAULT_EXCLUSIONS)
+        print(f"Wrote {args.write_default}")
+    for path in args.paths:
+        maze = load_maze(path)
+        print(f"{path}: {maze.rows}x{maze.cols}, {len(maze.walkable)} walkable cells, "
+              f"{len(maze.shared_route_cells)} shared-route cells -> {maze.path}")
@@ -0,0 +1,252 @@
+# maze_generator.py
+"""Seeded procedural mazes in the MAZE_LAYOUT format.
+
+generate_maze() carves a perfect maze over the odd rows and columns (iterative
+randomized depth-first search), opens extra walls to add loops, braids away a
+share of the dead ends and marks shared-route "C" cells. Every walkable cell stays
+reachable from every other one. The result holds the layout rows plus start cells
+and pellet exclusions for it:
+
+    maze = generate_maze(41, 61, seed=7)
+    sim = Simulation(layout=maze.layout, agent_starts=maze.start_positions,
+                     ghost_starts=maze.ghost_start_positions, exclusions=maze.exclusions)
+
+The same seed and parameters always give the same maze.
+
+    python maze_generator.py --rows 41 --cols 61 --seed 7 --shared-routes 6
+    python maze_generator.py --rows 2001 --cols 2001 --seed 7 --out big.maze
+"""
+import argparse
+import itertools
+import random
+import sys
+from config import *
+from maze_file import write_maze_file
+
+WALL, OPEN, SHARED = 0, 1, 2
+CELL_CHARS = bytes.maketrans(bytes((WALL, OPEN, SHARED)), b"#.C")
+
+# Where shared-route cells go: straight corridor cells, junctions (3+ open
+# neighbours) or any walkable cell
+PLACEMENTS = ("corridor", "junction", "random")
+
+# Candidates drawn per start cell; the one farthest from the starts chosen so far wins
+SPREAD_CANDIDATES = 10
+
+
+class GeneratedMaze:
+    def __init__(self, layout, start_positions, ghost_start_positions, exclusions, seed):
+        self.layout = layout                              # list of "#" / "." / "C" rows
+        self.start_positions = start_positions            # like START_POSITIONS
+        self.ghost_start_positions = ghost_start_positions
+        self.exclusions = exclusions                      # cells kept free of pellets
+        self.seed = seed
+        self.rows = len(layout)
+        self.cols = len(layout[0])
+
+
+def carve(rng, rows, cols):
+    """Perfect maze: one byte per cell, OPEN on the passages, WALL elsewhere."""
+    size = rows * cols
+    grid = bytearray(size)
+    unvisited = bytearray(size)
+    for r in range(1, rows, 2):
+        unvisited[r * cols + 1:(r + 1) * cols - 1:2] = b"\x01" * ((cols - 1) // 2)
+    orders = list(itertools.permutations((2, -2, 2 * cols, -2 * cols)))
+    uniform = rng.random   # cheaper than randrange() once per room
+
+    start = (2 * rng.randrange(rows // 2) + 1) * cols + 2 * rng.randrange(cols // 2) + 1
+    unvisited[start] = 0
+    grid[start] = OPEN
+    # Each room tries its neighbours in its own random order, resumed after backtracking
+    cells = [start]
+    pending = [iter(orders[int(uniform() * 24)])]
+    while cells:
+        cell = cells[-1]
+        for step in pending[-1]:
+            nxt = cell + step
+            # Steps past the border land on a wall row/column (or outside), never a room
+            if 0 < nxt < size and unvisited[nxt]:
+                unvisited[nxt] = 0
+                grid[cell + step // 2] = OPEN
+                grid[nxt] = OPEN
+                cells.append(nxt)
+                pending.append(iter(orders[int(uniform() * 24)]))
+                break
+        else:
+            cells.pop()
+            pending.pop()
+    return grid
+
+
+def add_loops(rng, grid, rows, cols, loop_density):
+    """Open loop_density of the inner walls that separate two passages."""
+    closed = []
+    for r in range(1, rows - 1):
+        first = 2 if r % 2 else 1   # walls between rooms: odd row & even col, or the reverse
+        base = r * cols
+        closed += [base + c for c in range(first, cols - 1, 2) if not grid[base + c]]
+    for cell in rng.sample(closed, int(len(closed) * loop_density)):
+        grid[cell] = OPEN
+
+
+def braid(rng, grid, rows, cols, dead_end_ratio):
+    """Open a wall at all but dead_end_ratio of the dead ends."""
+    size = rows * cols
+    steps = (1, -1, cols, -cols)
+    dead_ends = []
+    for r in range(1, rows - 1, 2):
+        base = r * cols
+        dead_ends += [cell for cell in range(base + 1, base + cols - 1, 2)
+                      if grid[cell + 1] + grid[cell - 1] + grid[cell + cols] + grid[cell - cols] == 1]
+    rng.shuffle(dead_ends)
+    for cell in dead_ends[:len(dead_ends) - round(len(dead_ends) * dead_end_ratio)]:
+        if grid[cell + 1] + grid[cell - 1] + grid[cell + cols] + grid[cell - cols] != 1:
+            continue  # already opened up by an earlier wall
+        walls = [step for step in steps
+                 if not grid[cell + step] and 0 < cell + 2 * step < size
+                 and (step in (cols, -cols) or 0 < cell % cols + 2 * step < cols - 1)]
+        if walls:
+            grid[cell + rng.choice(walls)] = OPEN
+
+
+def open_cells(grid):
+    """Ids of every walkable cell."""
+    return [cell for cell, value in enumerate(grid) if value]
+
+
+def fits_placement(grid, cell, cols, placement):
+    if placement == "random":
+        return True
+    right, left, down, up = grid[cell + 1], grid[cell - 1], grid[cell + cols], grid[cell - cols]
+    if placement == "junction":
+        return (right > 0) + (left > 0) + (down > 0) + (up > 0) >= 3
+    # corridor: open straight through, closed on both sides
+    return bool(right and left and not down and not up) or bool(down and up and not right and not left)
+
+
+def place_shared_routes(rng, grid, cols, cells, count, placement):
+    """Mark `count` cells fitting `placement` as SHARED (fewer if not that many fit)."""
+    chosen = set()
+    # Random draws find enough candidates fast on a big maze; scan only when they don't
+    for _ in range(50 * count):
+        if len(chosen) == count:
+            break
+        cell = cells[rng.randrange(len(cells))]
+        if fits_placement(grid, cell, cols, placement):
+            chosen.add(cell)
+    if len(chosen) < count:
+        rest = [cell for cell in cells
+                if cell not in chosen and fits_placement(grid, cell, cols, placement)]
+        chosen.update(rng.sample(rest, min(count - len(chosen), len(rest))))
+    for cell in sorted(chosen):
+        grid[cell] = SHARED
+
+
+def spread_starts(rng, free, count, taken, cols):
+    """count cells of `free`, each the farthest (Manhattan) of a few random candidates
+    from the cells in `taken` and those chosen before it."""
+    if count > len(free):
+        raise ValueError(f"maze has only {len(free)} free cells for {count} start positions")
+    chosen = []
+    placed = [divmod(cell, cols) for cell in taken]
+    used = set(taken)
+    for _ in range(count):
+        best, best_distance = None, -1
+        for _ in range(SPREAD_CANDIDATES):
+            cell = free[rng.randrange(len(free))]
+            if cell in used:
+                continue
+            r, c = divmod(cell, cols)
+            distance = min((abs(r - pr) + abs(c - pc) for pr, pc in placed), default=0)
+            if distance > best_distance:
+                best, best_distance = cell, distance
+        if best is None:  # only taken cells drawn: fall back to any free one
+            best = rng.choice([cell for cell in free if cell not in used])
+        chosen.append(best)
+        placed.append(divmod(best, cols))
+        used.add(best)
+    return chosen
+
+
+def exclusion_zone(grid, cols, starts, radius):
+    """Cells within `radius` steps of any start cell (the starts included)."""
+    steps = (1, -1, cols, -cols)
+    seen = set(starts)
+    frontier = list(starts)
+    for _ in range(radius):
+        frontier = [cell + step for cell in frontier for step in steps
+                    if grid[cell + step] and cell + step not in seen]
+        seen.update(frontier)
+    return {divmod(cell, cols) for cell in seen}
+
+
+def generate_maze(rows, cols, seed=None, loop_density=0.05, dead_end_ratio=0.5,
+                  shared_routes=4, placement="corridor", num_agents=NUM_AGENTS,
+                  num_ghosts=NUM_GHOSTS, exclusion_radius=1):
+    """A rows x cols GeneratedMaze (even sizes are rounded down to odd ones).
+
+    loop_density is the share of inner walls between two passages that are opened;
+    dead_end_ratio the share of dead ends left in place (0 removes them all).
+    shared_routes "C" cells are placed per `placement` (see PLACEMENTS). Agent starts
+    are spread over the maze, ghost starts kept away from them, and pellets are kept
+    off the cells within exclusion_radius steps of any start.
+    """
+    if placement not in PLACEMENTS:
+        raise ValueError(f"placement must be one of {', '.join(PLACEMENTS)}")
+    rows -= (rows + 1) % 2
+    cols -= (cols + 1) % 2
+    if rows < 5 or cols < 5:
+        raise ValueError("a generated maze needs at least 5 rows and 5 columns")
+    rng = random.Random(seed)
+
+    grid = carve(rng, rows, cols)
+    if loop_density > 0:
+        add_loops(rng, grid, rows, cols, loop_density)
+    if dead_end_ratio < 1:
+        braid(rng, grid, rows, cols, dead_end_ratio)
+
+    cells = open_cells(grid)
+    if shared_routes > 0:
+        place_shared_routes(rng, grid, cols, cells, shared_routes, placement)
+        cells = [cell for cell in cells if grid[cell] == OPEN]
+    agent_cells = spread_starts(rng, cells, num_agents, [], cols)
+    ghost_cells = spread_starts(rng, cells, num_ghosts, agent_cells, cols)
+
+    layout = [bytes(grid[r * cols:(r + 1) * cols]).translate(CELL_CHARS).decode()
+              for r in range(rows)]
+    return GeneratedMaze(
+        layout,
+        [divmod(cell, cols) for cell in agent_cells],
+        [divmod(cell, cols) for cell in ghost_cells],
+        exclusion_zone(grid, cols, agent_cells + ghost_cells, exclusion_radius),
+        seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a generated maze in config.py format.")
+    parser.add_argument("--rows", type=int, default=len(MAZE_LAYOUT))
+    parser.add_argument("--cols", type=int, default=len(MAZE_LAYOUT[0]))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--loops", type=float, default=0.05, help="loop density, 0..1")
+    parser.add_argument("--dead-ends", type=float, default=0.5, help="share of dead ends kept")
+    parser.add_argument("--shared-routes", type=int, default=4)
+    parser.add_argument("--placement", choices=PLACEMENTS, default="corridor")
+    parser.add_argument("--agents", type=int, default=NUM_AGENTS)
+    parser.add_argument("--ghosts", type=int, default=NUM_GHOSTS)
+    parser.add_argument("--out", help="write a maze file (see maze_file.py) instead of printing")
+    args = parser.parse_args()
+
+    maze = generate_maze(args.rows, args.cols, args.seed, args.loops, args.dead_ends,
+                         args.shared_routes, args.placement, args.agents, args.ghosts)
+    if args.out:
+        write_maze_file(args.out, maze.layout, maze.start_positions,
+                        maze.ghost_start_positions, maze.exclusions)
+        print(f"Wrote a {maze.rows}x{maze.cols} maze to {args.out}")
+        sys.exit()
+    print("MAZE_LAYOUT = [")
+    print(",\n".join(f'    "{row}"' for row in maze.layout))
+    print("]")
+    print(f"START_POSITIONS = {maze.start_positions}")
+    print(f"GHOST_START_POSITIONS = {maze.ghost_start_positions}")
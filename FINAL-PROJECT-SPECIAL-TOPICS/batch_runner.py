@@ -0,0 +1,188 @@
+# batch_runner.py
+import argparse
+import importlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STRATEGY_DIRS = {
+    "alternating_offers": os.path.join(ROOT_DIR, "Alternating Offers"),
+    "priority_baseline": os.path.join(ROOT_DIR, "Rriority-Based (baseline)"),
+}
+
+MANIFEST_FILE = "run_manifest.json"
+
+_loaded_strategy = None
+
+
+def load_strategy(strategy):
+    """Import `strategy`'s simulation and main modules.
+
+    Both strategy directories use the same flat module names (config, maze, agent, ...),
+    so switching strategy evicts the other directory's modules from sys.modules first.
+    """
+    global _loaded_strategy
+    if _loaded_strategy != strategy:
+        strategy_dirs = set(STRATEGY_DIRS.values())
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if path and os.path.dirname(os.path.abspath(path)) in strategy_dirs:
+                del sys.modules[name]
+        sys.path[:] = [p for p in sys.path if p not in strategy_dirs]
+        sys.path.insert(0, STRATEGY_DIRS[strategy])
+        _loaded_strategy = strategy
+    return importlib.import_module("simulation"), importlib.import_module("main")
+
+
+def strategy_module(strategy, name):
+    load_strategy(strategy)
+    return importlib.import_module(name)
+
+
+def run_chunk(strategy, episodes):
+    """Worker entry point: run (episode_id, seed) pairs and return their logs and summaries."""
+    simulation_module, _ = load_strategy(strategy)
+    results = []
+    # One Simulation per chunk: the maze is compiled once and the episode objects
+    # are reset in place between episodes
+    sim = simulation_module.Simulation()
+    for episode_id, seed in episodes:
+        sim.log_list = []
+        sim.summary_list = []
+        summary = sim.run_episode(episode_id, seed)
+        results.append((episode_id, sim.log_list, summary))
+    return strategy, results
+
+
+def chunk_episodes(seeds, first_episode, chunk_size):
+    episodes = [(first_episode + i, seed) for i, seed in enumerate(seeds)]
+    return [episodes[i:i + chunk_size] for i in range(0, len(episodes), chunk_size)]
+
+
+def run_batch(strategies, seeds, workers=None, first_episode=1, chunk_size=None,
+              on_episode=None):
+    """Run every seed for every strategy across a process pool.
+
+    Returns {strategy: (conflict_logs, episode_summaries)} ordered by episode number,
+    so the merged output does not depend on the worker count or completion order.
+    With on_episode, each episode is instead handed to on_episode(strategy, logs,
+    summary) in episode order as soon as it and every earlier episode are done, and
+    nothing is kept; only episodes finished ahead of a slower chunk wait in memory.
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, len(seeds) // (workers * 4))
+
+    merged = {strategy: ([], []) for strategy in strategies}
+    if on_episode is None:
+        def on_episode(strategy, logs, summary):
+            conflict_logs, summaries = merged[strategy]
+            conflict_logs.extend(logs)
+            summaries.append(summary)
+
+    waiting = {strategy: {} for strategy in strategies}
+    next_episode = {strategy: first_episode for strategy in strategies}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_chunk, strategy, chunk)
+            for strategy in strategies
+            for chunk in chunk_episodes(seeds, first_episode, chunk_size)
+        }
+        for future in as_completed(futures):
+            # Drop our reference so the chunk's results can be freed once handed on
+            futures.discard(future)
+            strategy, results = future.result()
+            episodes = waiting[strategy]
+            for episode_id, logs, summary in results:
+                episodes[episode_id] = (logs, summary)
+            while next_episode[strategy] in episodes:
+                on_episode(strategy, *episodes.pop(next_episode[strategy]))
+                next_episode[strategy] += 1
+    return merged
+
+
+def open_outputs(strategies, out_dir="."):
+    """{strategy: (conflict_logs, summaries)}: streaming sinks when that strategy's
+    STREAM_LOGS is on, plain lists for save_logs_to_csv otherwise."""
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = {}
+    for strategy in strategies:
+        _, main_module = load_strategy(strategy)
+        if main_module.STREAM_LOGS:
+            outputs[strategy] = main_module.open_log_sinks(out_dir)
+        else:
+            outputs[strategy] = ([], [])
+    return outputs
+
+
+def save_batch(merged, out_dir=".", batch_seed=None, seeds=(), first_episode=1):
+    """Write each strategy's CSVs with that strategy's own save_logs_to_csv schema
+    (or close its streaming sinks), plus a run manifest with the seeds and every
+    strategy's config."""
+    os.makedirs(out_dir, exist_ok=True)
+    configs = {}
+    for strategy, (conflict_logs, summaries) in merged.items():
+        _, main_module = load_strategy(strategy)
+        if isinstance(conflict_logs, list):
+            main_module.save_logs_to_csv(
+                conflict_logs,
+                filename=os.path.join(out_dir, main_module.CONFLICT_LOG_FILE),
+                summaries=summaries,
+                summary_filename=os.path.join(out_dir, main_module.EPISODE_SUMMARY_FILE),
+            )
+        else:
+            main_module.close_log_sinks(conflict_logs, summaries)
+        configs[strategy] = strategy_module(strategy, "seeding").config_snapshot()
+    seeding = strategy_module(next(iter(merged)), "seeding")
+    seeding.write_manifest(os.path.join(out_dir, MANIFEST_FILE), batch_seed, seeds,
+                           first_episode, configs)
+
+
+def resolve_seeds(args, strategies):
+    """Return (batch_seed, episode_seeds, first_episode) from --manifest, --seeds or --batch-seed."""
+    if args.manifest:
+        for strategy in strategies:
+            manifest = strategy_module(strategy, "seeding").load_manifest(args.manifest, strategy)
+        return manifest["batch_seed"], manifest["episode_seeds"], manifest["first_episode"]
+    if args.seeds:
+        return None, [int(s) for s in args.seeds.split(",") if s.strip()], 1
+    seeding = strategy_module(strategies[0], "seeding")
+    batch_seed = args.batch_seed if args.batch_seed is not None else seeding.new_batch_seed()
+    return batch_seed, seeding.derive_episode_seeds(batch_seed, args.episodes), 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run headless episodes of both strategies on all cores and save the CSV logs."
+    )
+    parser.add_argument("--strategies", default=",".join(STRATEGY_DIRS),
+                        help="comma-separated subset of: " + ", ".join(STRATEGY_DIRS))
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--batch-seed", type=int, default=None,
+                        help="per-episode seeds are derived from it (default: random)")
+    parser.add_argument("--seeds", help="explicit comma-separated seed list, one per episode")
+    parser.add_argument("--manifest", help="replay the seeds of an earlier run's " + MANIFEST_FILE)
+    parser.add_argument("--workers", type=int, default=None, help="default: os.cpu_count()")
+    parser.add_argument("--chunk-size", type=int, default=None, help="episodes per task")
+    parser.add_argument("--out-dir", default=".")
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    for strategy in strategies:
+        if strategy not in STRATEGY_DIRS:
+            parser.error(f"unknown strategy {strategy!r}")
+
+    batch_seed, seeds, first_episode = resolve_seeds(args, strategies)
+    outputs = open_outputs(strategies, args.out_dir)
+
+    def collect(strategy, logs, summary):
+        conflict_logs, summaries = outputs[strategy]
+        conflict_logs.extend(logs)
+        summaries.append(summary)
+
+    try:
+        run_batch(strategies, seeds, args.workers, first_episode, args.chunk_size,
+                  on_episode=collect)
+    finally:
+        save_batch(outputs, args.out_dir, batch_seed, seeds, first_episode)
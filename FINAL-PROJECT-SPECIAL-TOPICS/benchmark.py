@@ -0,0 +1,316 @@
+# benchmark.py
+"""Microbenchmarks of the simulation hot paths, for both strategies.
+
+Every case runs on a fixed scenario: a seeded episode warmed up for a fixed number
+of ticks, either with the configured population or a crowded one. Each case is
+repeated and reported as ops/sec (mean, standard deviation, min, max) over the
+repeats. Results go to a JSON file and can be compared against a stored baseline:
+
+    python benchmark.py --save-baseline                  # record benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.10
+
+The comparison uses each case's best repeat (the least disturbed by other load on the
+machine) and exits with status 1 when a case got slower than the baseline by more
+than the threshold.
+"""
+import argparse
+import contextlib
+import copy
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+from batch_runner import STRATEGY_DIRS, load_strategy, strategy_module
+
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+
+BENCH_SEED = 1234
+WARM_TICKS = 150
+CROWDED_AGENTS = 40
+CROWDED_GHOSTS = 8
+
+
+@contextlib.contextmanager
+def overrides(module, **values):
+    """Temporarily replace module-level settings (config values star-imported there)."""
+    saved = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+def scenario(strategy, agents=None, ghosts=None, seed=BENCH_SEED, warm_ticks=WARM_TICKS):
+    """Episode 1 of `strategy` seeded with `seed`, after warm_ticks ticks.
+
+    agents / ghosts default to the strategy's NUM_AGENTS / NUM_GHOSTS.
+    """
+    simulation_module, _ = load_strategy(strategy)
+    population = {}
+    if agents is not None:
+        population["NUM_AGENTS"] = agents
+    if ghosts is not None:
+        population["NUM_GHOSTS"] = ghosts
+    with overrides(simulation_module, **population):
+        sim = simulation_module.Simulation()
+        sim.reset(1, seed)
+    sim.manager.is_paused = False
+    for _ in range(warm_ticks):
+        if sim.step():
+            raise RuntimeError(f"{strategy}: benchmark episode ended during warm-up")
+    return sim
+
+
+class Case:
+    """One benchmark: `number` timed calls of op(state) per repeat.
+
+    setup() builds the state, once per repeat, or before every call (untimed) when
+    fresh is set, for operations that consume their input. ops_per_call scales the
+    result when one call stands for several operations.
+    """
+
+    def __init__(self, name, setup, op, number=200, fresh=False, ops_per_call=1):
+        self.name = name
+        self.setup = setup
+        self.op = op
+        self.number = number
+        self.fresh = fresh
+        self.ops_per_call = ops_per_call
+
+    def run_once(self):
+        perf_counter = time.perf_counter
+        op = self.op
+        if not self.fresh:
+            state = self.setup()
+            start = perf_counter()
+            for _ in range(self.number):
+                op(state)
+            return perf_counter() - start
+        elapsed = 0.0
+        for _ in range(self.number):
+            state = self.setup()
+            start = perf_counter()
+            op(state)
+            elapsed += perf_counter() - start
+        return elapsed
+
+    def measure(self, repeat):
+        self.run_once()  # warm-up
+        rates = [self.number * self.ops_per_call / self.run_once() for _ in range(repeat)]
+        mean = statistics.fmean(rates)
+        stdev = statistics.stdev(rates) if len(rates) > 1 else 0.0
+        return {
+            "ops_per_sec": mean,
+            "stdev": stdev,
+            "rel_stdev": stdev / mean if mean else 0.0,
+            "min": min(rates),
+            "max": max(rates),
+            "repeats": rates,
+        }
+
+
+def cycling(template, select):
+    """setup() for per-item cases: (copy of template, endless cycle over select(copy))."""
+    def setup():
+        sim = copy.deepcopy(template)
+        return sim, itertools.cycle(select(sim))
+
+    return setup
+
+
+def active_agents(sim):
+    return [a for a in sim.agents if a.is_active]
+
+
+def strategy_cases(strategy):
+    agent_module = strategy_module(strategy, "agent")
+    maze_module = strategy_module(strategy, "maze")
+    config = strategy_module(strategy, "config")
+    base = scenario(strategy)
+    crowded = scenario(strategy, CROWDED_AGENTS, CROWDED_GHOSTS)
+    cases = []
+
+    start_cells = [(a.row, a.col) for a in base.agents] + [(g.row, g.col) for g in base.ghosts]
+    cases.append(Case(
+        "maze_init", lambda: random.Random(BENCH_SEED),
+        lambda rng: maze_module.Maze(None, rng, start_cells), number=50,
+    ))
+
+    # Per-agent / per-ghost cases cycle through the crowded scenario's population
+    cases.append(Case(
+        "bfs_find_path", cycling(crowded, active_agents),
+        lambda state: next(state[1]).bfs_find_path(),
+    ))
+
+    def full_bfs(state):
+        with overrides(agent_module, USE_PELLET_DISTANCE_FIELD=False):
+            next(state[1]).bfs_find_path()
+
+    cases.append(Case("bfs_find_path_full", cycling(crowded, active_agents), full_bfs))
+    cases.append(Case(
+        "detect_potential_conflict", cycling(crowded, active_agents),
+        lambda state: next(state[1]).detect_potential_conflict(), number=2000,
+    ))
+
+    if hasattr(crowded.manager, "process_negotiations"):
+        for round_idx in range(config.MAX_NEGOTIATION_ROUNDS + 1):
+            cases.append(Case(
+                f"process_negotiations_round{round_idx}",
+                lambda round_idx=round_idx: negotiation_state(crowded, round_idx),
+                lambda sim: sim.manager.process_negotiations(), number=100, fresh=True,
+            ))
+    if hasattr(crowded.manager, "handle_priority_conflict"):
+        cases.append(Case(
+            "handle_priority_conflict", lambda: copy.deepcopy(crowded),
+            lambda sim: priority_conflicts(sim), number=100, fresh=True,
+        ))
+
+    cases.append(Case(
+        "resolve_path_conflicts", lambda: decided_state(crowded),
+        lambda sim: sim.manager.resolve_path_conflicts(sim.agents), number=100, fresh=True,
+    ))
+
+    def ghost_move(state):
+        sim, ghosts = state
+        ghost = next(ghosts)
+        ghost.move_timer = config.GHOST_SPEED - 1  # make every call a real move
+        ghost.decide_next_move(sim.agents)
+
+    cases.append(Case(
+        "ghost_decide_next_move",
+        cycling(crowded, lambda sim: [g for g in sim.ghosts if g.is_active]),
+        ghost_move, number=2000,
+    ))
+
+    for label, template in (("headless_tick", base), ("headless_tick_crowded", crowded)):
+        cases.append(Case(
+            label, lambda template=template: copy.deepcopy(template),
+            lambda sim: run_ticks(sim, 50), number=10, fresh=True, ops_per_call=50,
+        ))
+    return cases
+
+
+def negotiation_state(template, round_idx):
+    """Copy of `template` with a session at round_idx between each pair of free agents."""
+    sim = copy.deepcopy(template)
+    manager = sim.manager
+    free = [a for a in sim.agents if a.is_active and not a.in_conflict]
+    for agent_a, agent_b in zip(free[::2], free[1::2]):
+        manager.start_negotiation(agent_a, agent_b, (agent_a.row, agent_a.col))
+    for session in manager.negotiations.values():
+        session["round"] = round_idx
+    return sim
+
+
+def priority_conflicts(sim):
+    manager = sim.manager
+    agents = [a for a in sim.agents if a.is_active]
+    for agent_a, agent_b in zip(agents[::2], agents[1::2]):
+        manager.handle_priority_conflict(agent_a, agent_b, (agent_a.row, agent_a.col))
+
+
+def decided_state(template):
+    """Copy of `template` with this tick's ghost and agent decisions made."""
+    sim = copy.deepcopy(template)
+    sim.manager.time_step += 1
+    if hasattr(sim.manager, "process_negotiations"):
+        sim.manager.process_negotiations()
+    sim.move_ghosts()
+    sim.decide_agents()
+    return sim
+
+
+def run_ticks(sim, ticks):
+    for _ in range(ticks):
+        if sim.step():
+            break
+
+
+def run_suite(strategies, repeat, only=None):
+    results = {}
+    for strategy in strategies:
+        results[strategy] = {}
+        for case in strategy_cases(strategy):
+            if only and not any(name in case.name for name in only):
+                continue
+            stats = case.measure(repeat)
+            results[strategy][case.name] = stats
+            print(f"{strategy:<20} {case.name:<34} {stats['ops_per_sec']:>12,.0f} ops/s "
+                  f"± {stats['rel_stdev']:.1%}")
+    return results
+
+
+def save_results(path, results, repeat):
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": BENCH_SEED,
+            "repeat": repeat,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"Saved benchmark results to {path}")
+
+
+def compare(results, baseline_path, threshold):
+    """Print the change against a baseline; return the cases slower than threshold."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for strategy, cases in results.items():
+        for name, stats in cases.items():
+            before = baseline.get(strategy, {}).get(name)
+            if before is None:
+                print(f"{strategy:<20} {name:<34} (not in baseline)")
+                continue
+            change = stats["max"] / before["max"] - 1
+            flag = ""
+            if change < -threshold:
+                flag = "  REGRESSION"
+                regressions.append((strategy, name, change))
+            print(f"{strategy:<20} {name:<34} {change:>+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmarks of the simulation hot paths.")
+    parser.add_argument("--strategies", default=",".join(STRATEGY_DIRS),
+                        help="comma-separated subset of: " + ", ".join(STRATEGY_DIRS))
+    parser.add_argument("--only", help="comma-separated substrings of case names to run")
+    parser.add_argument("--repeat", type=int, default=7, help="timed repeats per case")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    parser.add_argument("--baseline", help="compare against this earlier results file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown against the baseline (0.10 = 10%%)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="also write the results to " + BASELINE_FILE)
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    for strategy in strategies:
+        if strategy not in STRATEGY_DIRS:
+            parser.error(f"unknown strategy {strategy!r}")
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+
+    results = run_suite(strategies, args.repeat, only)
+    save_results(args.out, results, args.repeat)
+    if args.save_baseline:
+        save_results(BASELINE_FILE, results, args.repeat)
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline by more than "
+                  f"{args.threshold:.0%}")
+            sys.exit(1)
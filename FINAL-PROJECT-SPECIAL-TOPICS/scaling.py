@@ -0,0 +1,326 @@
+# scaling.py
+"""How the cost of a tick grows with maze size, agent count and ghost count.
+
+Mazes are built by tiling the 31x21 MAZE_LAYOUT (tiles x tiles copies sharing their
+border walls, with doors wherever corridors meet across a seam), so --tiles 34
+gives a 1021x681 maze. With --generated they are instead procedural mazes of the
+same size (maze_generator.py, seeded), with the generator's start cells. Three
+sweeps run around a base point (--base-tiles, --base-agents, --base-ghosts): maze
+size, agent count and ghost count, each with the others held at the base. Every
+configuration plays a fixed-length episode (--ticks, no idle skipping) from the
+same seed in a fresh process, which records:
+
+  layout_s               seconds to tile or generate the layout
+  build_s                seconds to build the episode (maze, distance fields, agents)
+  ms_per_tick            wall time of Simulation.step()
+  *_per_tick             profiler counters (BFS expansions, replans, danger checks,
+                         lock operations) from a profiled run of the same episode
+  peak_rss_mb            peak resident memory of that process
+  log_rows / log_bytes   conflict log volume (as CSV)
+
+The runs go to scaling_results.csv. For every sweep, power laws y = a * x^b are
+fitted on log-log scales (x = walkable cells, agents or ghosts) and written to
+scaling_fits.csv, and plotted to scaling_<sweep>.png when matplotlib is installed.
+
+    python scaling.py --tiles 1,2,4,8,16,34 --agents 3,10,30,100,300 --ghosts 2,8,32
+"""
+import argparse
+import csv
+import io
+import math
+import multiprocessing
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not on Windows; peak RSS is left empty there
+    resource = None
+
+try:
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+except ImportError:  # plots are optional; the CSVs are always written
+    plt = None
+
+from batch_runner import STRATEGY_DIRS, load_strategy, strategy_module
+from benchmark import BENCH_SEED, overrides
+
+RESULTS_FILE = "scaling_results.csv"
+FITS_FILE = "scaling_fits.csv"
+
+SWEEPS = {
+    # sweep -> column used as x
+    "maze": "cells",
+    "agents": "agents",
+    "ghosts": "ghosts",
+}
+FIT_METRICS = ("ms_per_tick", "build_s", "bfs_expansions_per_tick", "danger_checks_per_tick",
+               "peak_rss_mb", "log_rows_per_tick")
+RESULT_FIELDS = [
+    "strategy", "sweep", "maze", "tiles", "rows", "cols", "cells", "agents", "ghosts", "ticks",
+    "layout_s", "build_s", "ms_per_tick", "bfs_expansions_per_tick", "replans_per_tick",
+    "danger_checks_per_tick", "lock_ops_per_tick", "log_rows", "log_bytes",
+    "log_rows_per_tick", "peak_rss_mb",
+]
+
+
+def tile_layout(layout, tiles_x, tiles_y):
+    """`layout` repeated tiles_x by tiles_y times.
+
+    Neighbouring copies share their border wall, which is opened wherever the cells
+    on both sides of it are walkable, so the tiled maze stays connected.
+    """
+    height, width = len(layout), len(layout[0])
+    rows = tiles_y * (height - 1) + 1
+    cols = tiles_x * (width - 1) + 1
+    grid = [["#"] * cols for _ in range(rows)]
+    for ty in range(tiles_y):
+        for tx in range(tiles_x):
+            for r, line in enumerate(layout):
+                out = grid[ty * (height - 1) + r]
+                for c, cell in enumerate(line):
+                    if cell != "#":
+                        out[tx * (width - 1) + c] = cell
+    for k in range(1, tiles_x):
+        c = k * (width - 1)
+        for r in range(1, rows - 1):
+            if grid[r][c - 1] != "#" and grid[r][c + 1] != "#":
+                grid[r][c] = "."
+    for k in range(1, tiles_y):
+        r = k * (height - 1)
+        for c in range(1, cols - 1):
+            if grid[r - 1][c] != "#" and grid[r + 1][c] != "#":
+                grid[r][c] = "."
+    return ["".join(line) for line in grid]
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_maze(strategy, tiles, agents, ghosts, generated=False):
+    """Simulation keyword arguments for the maze of a configuration."""
+    layout = strategy_module(strategy, "config").MAZE_LAYOUT
+    if not generated:
+        return {"layout": tile_layout(layout, tiles, tiles)}
+    maze = strategy_module(strategy, "maze_generator").generate_maze(
+        tiles * (len(layout) - 1) + 1, tiles * (len(layout[0]) - 1) + 1, seed=BENCH_SEED,
+        num_agents=agents, num_ghosts=ghosts,
+    )
+    return {"layout": maze.layout, "agent_starts": maze.start_positions,
+            "ghost_starts": maze.ghost_start_positions, "exclusions": maze.exclusions}
+
+
+def play(simulation_module, maze, agents, ghosts, ticks, profiler=None):
+    """Play up to `ticks` ticks of the seeded episode; return (sim, ticks played, seconds)."""
+    with overrides(simulation_module, NUM_AGENTS=agents, NUM_GHOSTS=ghosts):
+        sim = simulation_module.Simulation(skip_idle=False, profiler=profiler, **maze)
+        sim.reset(1, BENCH_SEED)
+    sim.manager.is_paused = False
+    played = 0
+    start = time.perf_counter()
+    while played < ticks:
+        played += 1
+        if sim.step():
+            break
+    return sim, played, time.perf_counter() - start
+
+
+def run_config(job):
+    """Worker entry point: measure one (strategy, sweep, tiles, agents, ghosts, ticks,
+    generated) job."""
+    strategy, sweep, tiles, agents, ghosts, ticks, generated = job
+    simulation_module, main_module = load_strategy(strategy)
+    profiler_module = strategy_module(strategy, "profiler")
+
+    start = time.perf_counter()
+    maze = build_maze(strategy, tiles, agents, ghosts, generated)
+    layout_s = time.perf_counter() - start
+    layout = maze["layout"]
+    start = time.perf_counter()
+    with overrides(simulation_module, NUM_AGENTS=agents, NUM_GHOSTS=ghosts):
+        simulation_module.Simulation(**maze).reset(1, BENCH_SEED)
+    build_s = time.perf_counter() - start
+
+    # The profiled run supplies the work counters (and warms up); the same seeded
+    # episode is then timed without the profiler
+    profiler = profiler_module.TickProfiler()
+    play(simulation_module, maze, agents, ghosts, ticks, profiler)
+    counters = profiler.episodes[-1]["counters"] if profiler.episodes else profiler.counters
+    sim, played, seconds = play(simulation_module, maze, agents, ghosts, ticks)
+    log = io.StringIO()
+    writer = csv.DictWriter(log, fieldnames=main_module.CONFLICT_LOG_FIELDS)
+    writer.writerows(sim.log_list)
+
+    return {
+        "strategy": strategy,
+        "sweep": sweep,
+        "maze": "generated" if generated else "tiled",
+        "tiles": tiles,
+        "rows": len(layout),
+        "cols": len(layout[0]),
+        "cells": sum(line.count(".") + line.count("C") for line in layout),
+        "agents": agents,
+        "ghosts": ghosts,
+        "ticks": played,
+        "layout_s": layout_s,
+        "build_s": build_s,
+        "ms_per_tick": seconds * 1000 / played,
+        "bfs_expansions_per_tick": counters["bfs_expansions"] / played,
+        "replans_per_tick": counters["replans"] / played,
+        "danger_checks_per_tick": counters["danger_checks"] / played,
+        "lock_ops_per_tick": counters["lock_ops"] / played,
+        "log_rows": len(sim.log_list),
+        "log_bytes": len(log.getvalue()),
+        "log_rows_per_tick": len(sim.log_list) / played,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def sweep_jobs(strategies, tiles, agents, ghosts, base, ticks, generated=False):
+    base_tiles, base_agents, base_ghosts = base
+    jobs = []
+    for strategy in strategies:
+        jobs += [(strategy, "maze", t, base_agents, base_ghosts, ticks, generated) for t in tiles]
+        jobs += [(strategy, "agents", base_tiles, a, base_ghosts, ticks, generated)
+                 for a in agents]
+        jobs += [(strategy, "ghosts", base_tiles, base_agents, g, ticks, generated)
+                 for g in ghosts]
+    return jobs
+
+
+def run_sweeps(jobs, workers=1):
+    """Run every job in its own process (so peak RSS is per configuration), in order."""
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with context.Pool(workers, maxtasksperchild=1) as pool:
+        for row in pool.imap(run_config, jobs):
+            print(f"{row['strategy']:<20} {row['sweep']:<7} {row['rows']:>5}x{row['cols']:<5} "
+                  f"agents {row['agents']:>4} ghosts {row['ghosts']:>3}: "
+                  f"{row['ms_per_tick']:8.3f} ms/tick  "
+                  f"{row['bfs_expansions_per_tick']:9.1f} BFS cells/tick  "
+                  f"{row['peak_rss_mb'] or 0:7.1f} MB")
+            results.append(row)
+    return results
+
+
+def fit_power_law(points):
+    """Least-squares fit of y = a * x^b on log-log scales: (a, b, r2), or None."""
+    points = [(math.log(x), math.log(y)) for x, y in points if x > 0 and y and y > 0]
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    sxx = sum((x - mean_x) ** 2 for x, _ in points)
+    if sxx == 0:
+        return None
+    b = sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx
+    a = mean_y - b * mean_x
+    total = sum((y - mean_y) ** 2 for _, y in points)
+    residual = sum((y - (a + b * x)) ** 2 for x, y in points)
+    return math.exp(a), b, 1 - residual / total if total else 1.0
+
+
+def fit_curves(results):
+    fits = []
+    for strategy in dict.fromkeys(row["strategy"] for row in results):
+        for sweep, x_name in SWEEPS.items():
+            rows = [row for row in results if row["strategy"] == strategy and row["sweep"] == sweep]
+            for metric in FIT_METRICS:
+                fit = fit_power_law([(row[x_name], row[metric]) for row in rows])
+                if fit is None:
+                    continue
+                coefficient, exponent, r2 = fit
+                fits.append({"strategy": strategy, "sweep": sweep, "x": x_name, "metric": metric,
+                             "exponent": exponent, "coefficient": coefficient, "r2": r2})
+    return fits
+
+
+def write_csv(path, rows, fieldnames):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Saved {len(rows)} rows to {path}")
+
+
+def plot_sweeps(results, fits, prefix="scaling"):
+    if plt is None:
+        print("matplotlib is not installed; skipping plots (the CSVs have everything)")
+        return
+    for sweep, x_name in SWEEPS.items():
+        figure, axes = plt.subplots(1, 2, figsize=(11, 4.5))
+        for axis, metric in zip(axes, ("ms_per_tick", "bfs_expansions_per_tick")):
+            for strategy in dict.fromkeys(row["strategy"] for row in results):
+                rows = [row for row in results
+                        if row["strategy"] == strategy and row["sweep"] == sweep]
+                if not rows:
+                    continue
+                xs = [row[x_name] for row in rows]
+                label = strategy
+                for fit in fits:
+                    if (fit["strategy"], fit["sweep"], fit["metric"]) == (strategy, sweep, metric):
+                        label += f" (~{x_name}^{fit['exponent']:.2f})"
+                axis.loglog(xs, [row[metric] for row in rows], "o-", label=label)
+            axis.set_xlabel(x_name)
+            axis.set_ylabel(metric)
+            axis.grid(True, which="both", alpha=0.3)
+            axis.legend()
+        figure.suptitle(f"Scaling with {x_name}")
+        figure.tight_layout()
+        path = f"{prefix}_{sweep}.png"
+        figure.savefig(path)
+        plt.close(figure)
+        print(f"Saved plot to {path}")
+
+
+def int_list(text):
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure how tick cost grows with maze size, agents and ghosts."
+    )
+    parser.add_argument("--strategies", default=",".join(STRATEGY_DIRS),
+                        help="comma-separated subset of: " + ", ".join(STRATEGY_DIRS))
+    parser.add_argument("--tiles", type=int_list, default=[1, 2, 4, 8, 16],
+                        help="maze sweep: MAZE_LAYOUT copies per side")
+    parser.add_argument("--generated", action="store_true",
+                        help="use generated mazes of the tiled sizes instead of tiling")
+    parser.add_argument("--agents", type=int_list, default=[3, 10, 30, 100])
+    parser.add_argument("--ghosts", type=int_list, default=[2, 8, 32])
+    parser.add_argument("--base-tiles", type=int, default=2)
+    parser.add_argument("--base-agents", type=int, default=3)
+    parser.add_argument("--base-ghosts", type=int, default=2)
+    parser.add_argument("--ticks", type=int, default=300, help="ticks per episode")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="configurations measured at once (more skews the timings)")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    parser.add_argument("--fits", default=FITS_FILE)
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    for strategy in strategies:
+        if strategy not in STRATEGY_DIRS:
+            parser.error(f"unknown strategy {strategy!r}")
+
+    jobs = sweep_jobs(strategies, args.tiles, args.agents, args.ghosts,
+                      (args.base_tiles, args.base_agents, args.base_ghosts), args.ticks,
+                      args.generated)
+    results = run_sweeps(jobs, args.workers)
+    write_csv(args.out, results, RESULT_FIELDS)
+    fits = fit_curves(results)
+    write_csv(args.fits, fits, ["strategy", "sweep", "x", "metric", "exponent", "coefficient", "r2"])
+    for fit in fits:
+        if fit["metric"] == "ms_per_tick":
+            print(f"{fit['strategy']:<20} ms/tick ~ {fit['x']}^{fit['exponent']:.2f} "
+                  f"(R^2 {fit['r2']:.3f})")
+    plot_sweeps(results, fits)